@@ -4,98 +4,34 @@ Production deployment script for UploadServer Pro
 
 import os
 import sys
-import subprocess
-import platform
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def check_system_requirements():
-    """Check if system meets requirements"""
-    print("🔍 Checking system requirements...")
-    
-    # Python version
-    python_version = sys.version_info
-    if python_version < (3, 8):
-        print(f"❌ Python {python_version.major}.{python_version.minor} is too old. Requires Python 3.8+")
-        return False
-    else:
-        print(f"✅ Python {python_version.major}.{python_version.minor}")
-    
-    # System architecture
-    system = platform.system()
-    machine = platform.machine()
-    print(f"✅ System: {system} ({machine})")
-    
-    # Memory check (basic)
-    try:
-        import psutil
-        memory = psutil.virtual_memory()
-        if memory.total < 4 * 1024**3:  # Less than 4GB
-            print(f"⚠️  Warning: Low memory ({memory.total // (1024**3)}GB). 8GB+ recommended")
-        else:
-            print(f"✅ Memory: {memory.total // (1024**3)}GB")
-    except ImportError:
-        print("⚠️  psutil not available - cannot check memory")
-    
-    return True
-
-def install_dependencies():
-    """Install all production dependencies"""
-    print("\n📦 Installing production dependencies...")
-    
-    core_deps = [
-        "Flask>=2.3",
-        "Flask-SocketIO>=5.3",
-        "Flask-SQLAlchemy>=3.0",
-        "Flask-Login>=0.6",
-        "SQLAlchemy>=2.0",
-        "Werkzeug>=2.3",
-        "psycopg2-binary>=2.9",
-        "redis>=4.5",
-        "celery>=5.2",
-        "elasticsearch>=8.9",
-        "boto3>=1.28",
-        "whoosh>=2.7",
-        "passlib[bcrypt]>=1.7",
-        "python-jose[cryptography]>=3.3",
-        "python-multipart>=0.0.6",
-        "gunicorn>=21.0",
-        "pillow>=9.5",
-        "watchdog>=3.0",
-        "psutil>=5.9",
-        "python-magic>=0.4"
-    ]
-    
-    try:
-        for dep in core_deps:
-            print(f"   Installing {dep}...")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", dep], stdout=subprocess.DEVNULL)
-        print("✅ All dependencies installed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error installing dependencies: {e}")
-        return False
+NEXT_STEPS = """
+✅ Production setup complete!
+
+📋 Next steps:
+1. Review and update config/production.py
+2. Set environment variables (DATABASE_URL, SECRET_KEY, etc.)
+3. Install systemd service:
+   sudo cp uploadserverpro.service /etc/systemd/system/
+   sudo systemctl daemon-reload
+   sudo systemctl enable uploadserverpro
+   sudo systemctl start uploadserverpro
+4. Configure nginx:
+   sudo cp nginx-uploadserverpro.conf /etc/nginx/sites-available/
+   sudo ln -s /etc/nginx/sites-available/uploadserverpro.conf /etc/nginx/sites-enabled/
+   sudo nginx -t && sudo systemctl reload nginx
+5. Or use Docker:
+   docker-compose -f docker-compose.prod.yml up -d
+
+📚 Documentation: https://docs.uploadserverpro.com
+🐛 Issues: https://github.com/MuadzHdz/uploadserverpro/issues
+"""
 
-def setup_production_environment():
-    """Setup production environment"""
-    print("\n🏗 Setting up production environment...")
-    
-    # Create directories
-    directories = [
-        "logs",
-        "uploads",
-        "config",
-        "search_index",
-        "backups",
-        "ssl",
-        "plugins"
-    ]
-    
-    for directory in directories:
-        Path(directory).mkdir(exist_ok=True)
-        print(f"   ✅ Created {directory}/ directory")
-    
-    # Create production config
-    config_content = f"""
+# Generated configuration templates. Only the systemd unit depends on the
+# deploy location, so it is the only one rendered with format_map.
+PRODUCTION_CONFIG = """
 # Production Configuration for UploadServer Pro
 import os
 from pathlib import Path
@@ -138,15 +74,28 @@ ENABLE_2FA = os.getenv('ENABLE_2FA', 'false').lower() == 'true'
 FORCE_HTTPS = os.getenv('FORCE_HTTPS', 'false').lower() == 'true'
 SSL_CERT_PATH = os.getenv('SSL_CERT_PATH', '/etc/ssl/certs/uploadserver.crt')
 SSL_KEY_PATH = os.getenv('SSL_KEY_PATH', '/etc/ssl/private/uploadserver.key')
+
+# Base directories provisioned by the package/systemd unit; these always
+# exist, so runtime directory creation starts below them
+EXISTING_PATH_PREFIXES = ('/var/lib/uploadserver', '/var/log/uploadserver')
+
+def ensure_dir(path):
+    # Create path without re-attempting mkdir on the known existing prefixes
+    path = str(path)
+    for prefix in EXISTING_PATH_PREFIXES:
+        if path.startswith(prefix + os.sep):
+            current = prefix
+            for part in filter(None, path[len(prefix) + 1:].split(os.sep)):
+                current = os.path.join(current, part)
+                try:
+                    os.mkdir(current)
+                except FileExistsError:
+                    pass
+            return
+    os.makedirs(path, exist_ok=True)
 """
-    
-    with open("config/production.py", "w") as f:
-        f.write(config_content)
-    
-    print("   ✅ Created config/production.py")
-    
-    # Create systemd service file
-    service_content = f"""[Unit]
+
+SERVICE_TEMPLATE = """[Unit]
 Description=UploadServer Pro - Enterprise File Sharing Platform
 After=network.target postgresql.service redis.service
 Wants=postgresql.service redis.service
@@ -155,15 +104,15 @@ Wants=postgresql.service redis.service
 Type=exec
 User=uploadserver
 Group=uploadserver
-WorkingDirectory={Path.cwd()}
-Environment=PYTHONPATH={Path.cwd()}
+WorkingDirectory={cwd}
+Environment=PYTHONPATH={cwd}
 Environment=CONFIG_PATH=production
-ExecStart={sys.executable} -m uploadserver.advanced_main
+ExecStart={python} -m uploadserver.advanced_main
     --database-url $DATABASE_URL
     --redis-url $REDIS_URL
     --workers $WORKERS
-    --site-name "{{{{SITE_NAME}}}"
-    --admin-email "{{{{ADMIN_EMAIL}}}"
+    --site-name "{{{{SITE_NAME}}}}"
+    --admin-email "{{{{ADMIN_EMAIL}}}}"
 ExecReload=/bin/kill -HUP $MAINPID
 Restart=always
 RestartSec=10
@@ -177,33 +126,35 @@ WantedBy=multi-user.target
 [Install]
 WantedBy=graphical-session.target
 """
-    
-    with open("uploadserverpro.service", "w") as f:
-        f.write(service_content)
-    
-    print("   ✅ Created uploadserverpro.service")
-    
-    # Create nginx configuration
-    nginx_config = f"""
+
+NGINX_CONFIG = """
 # Nginx configuration for UploadServer Pro
-upstream uploadserver {{
+upstream uploadserver {
     server 127.0.0.1:8000;
-    keepalive 32;
-}}
-
-server {{
+    keepalive 64;
+    keepalive_requests 1000;
+    keepalive_timeout 60s;
+}
+
+# Cache open file descriptors and stat() results for static assets
+open_file_cache max=10000 inactive=5m;
+open_file_cache_valid 2m;
+open_file_cache_min_uses 2;
+open_file_cache_errors on;
+
+server {
     listen 80;
     listen [::]:80;
-    server_name {{{{DOMAIN}}}};
+    server_name {{DOMAIN}};
     
     # Redirect to HTTPS
     return 301 https://$server_name$request_uri;
-}}
+}
 
-server {{
+server {
     listen 443 ssl http2;
     listen [::]:443 ssl http2;
-    server_name {{{{DOMAIN}}}};
+    server_name {{DOMAIN}};
     
     # SSL Configuration
     ssl_certificate /etc/ssl/certs/uploadserver.crt;
@@ -221,8 +172,14 @@ server {{
     # Client Upload Size
     client_max_body_size 100M;
     
+    # Compression
+    gzip on;
+    gzip_comp_level 5;
+    gzip_types text/css application/javascript application/json image/svg+xml;
+    gzip_vary on;
+    
     # WebSocket Support
-    location /socket.io {{
+    location /socket.io {
         proxy_pass http://uploadserver;
         proxy_http_version 1.1;
         proxy_set_header Upgrade $http_upgrade;
@@ -232,10 +189,15 @@ server {{
         proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
         proxy_set_header X-Forwarded-Proto $scheme;
         proxy_cache_bypass $http_upgrade;
-    }}
+    }
     
-    location / {{
+    location / {
         proxy_pass http://uploadserver;
+        
+        # Reuse upstream keepalive connections
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        
         proxy_set_header Host $host;
         proxy_set_header X-Real-IP $remote_addr;
         proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
@@ -251,73 +213,259 @@ server {{
         proxy_buffer_size 4k;
         proxy_buffers 8 4k;
         proxy_busy_buffers_size 8k;
-    }}
+    }
     
     # Static files (optional)
-    location /static {{
+    location /static {
         alias /var/lib/uploadserver/static;
         expires 1y;
         add_header Cache-Control "public, immutable";
-    }}
+    }
     
     # Logs
     access_log /var/log/nginx/uploadserver_access.log;
     error_log /var/log/nginx/uploadserver_error.log;
-}}
+}
 """
+
+def check_system_requirements():
+    """Check if system meets requirements"""
+    report = ["🔍 Checking system requirements..."]
     
-    with open("nginx-uploadserverpro.conf", "w") as f:
-        f.write(nginx_config)
+    # Python version
+    major, minor = sys.version_info[:2]
+    if (major, minor) < (3, 8):
+        report.append(f"❌ Python {major}.{minor} is too old. Requires Python 3.8+")
+        print("\n".join(report))
+        return False
+    else:
+        report.append(f"✅ Python {major}.{minor}")
     
-    print("   ✅ Created nginx-uploadserverpro.conf")
+    # System architecture
+    import platform
+    system = platform.system()
+    machine = platform.machine()
+    report.append(f"✅ System: {system} ({machine})")
+    
+    # Memory check (basic)
+    try:
+        import psutil
+        memory_gb = psutil.virtual_memory().total >> 30
+        if memory_gb < 4:  # Less than 4GB
+            report.append(f"⚠️  Warning: Low memory ({memory_gb}GB). 8GB+ recommended")
+        else:
+            report.append(f"✅ Memory: {memory_gb}GB")
+    except ImportError:
+        report.append("⚠️  psutil not available - cannot check memory")
+    
+    print("\n".join(report))
+    return True
+
+def pip_install(packages, *options, in_process=False):
+    """Run a single quiet pip install for the given packages
+
+    With ``in_process`` pip is driven through its CLI entry point inside this
+    interpreter, skipping a cold interpreter start. pip keeps global state, so
+    this is only safe for calls that are not running concurrently.
+    """
+    import subprocess
+    
+    args = ["install", "--no-input", "--disable-pip-version-check", *options, *packages]
+
+    if in_process:
+        try:
+            from pip._internal.cli.main import main as pip_main
+        except ImportError:
+            pass
+        else:
+            returncode = pip_main(["--quiet", *args])
+            if returncode:
+                raise subprocess.CalledProcessError(returncode, ["pip", *args])
+            return
+
+    subprocess.check_call([sys.executable, "-m", "pip", *args], stdout=subprocess.DEVNULL)
+
+def write_files(files):
+    """Write (path, content) pairs concurrently in a single pass"""
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda item: Path(item[0]).write_bytes(item[1].encode()), files))
+    print("\n".join(f"   ✅ Created {path}" for path, _ in files))
+
+def install_dependencies(requirements_path):
+    """Install all production dependencies from a requirements file"""
+    print("\n📦 Installing production dependencies...")
+    import subprocess
+    
+    with open(requirements_path) as f:
+        core_deps = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    
+    try:
+        # Download and unpack groups concurrently without dependency resolution,
+        # then let one final pass resolve and fix up the whole set
+        workers = min(4, os.cpu_count() or 1)
+        groups = [core_deps[i::workers] for i in range(workers)]
+        print(f"   Installing {len(core_deps)} packages in {workers} parallel groups...")
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(pip_install, group, "--no-deps") for group in groups]
+            for group, future in zip(groups, futures):
+                if future.exception():
+                    failed.extend(group)
+
+        # Fall back to installing failed packages one by one
+        for dep in failed:
+            print(f"   Retrying {dep}...")
+            pip_install([dep], in_process=True)
+
+        # One resolver pass over the full requirements file
+        pip_install([], "-r", requirements_path, in_process=True)
+        print("✅ All dependencies installed successfully")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Error installing dependencies: {e}")
+        return False
+
+def setup_production_environment():
+    """Setup production environment"""
+    print("\n🏗 Setting up production environment...")
+    
+    # Create directories
+    directories = [
+        "logs",
+        "uploads",
+        "config",
+        "search_index",
+        "backups",
+        "ssl",
+        "plugins"
+    ]
+    
+    # Snapshot the working directory once; on re-deploys every directory is
+    # already present and no mkdir is issued at all
+    existing_dirs = {entry.name for entry in os.scandir(".") if entry.is_dir()}
+    created = [directory for directory in directories if directory not in existing_dirs]
+    for directory in created:
+        os.mkdir(directory)
+    if created:
+        print("   ✅ Created directories: " + ", ".join(f"{d}/" for d in created))
+    if len(created) < len(directories):
+        print("   ✅ Existing directories: " + ", ".join(f"{d}/" for d in directories if d in existing_dirs))
+    
+    # Create production config, systemd service and nginx configuration
+    service_content = SERVICE_TEMPLATE.format_map({"cwd": Path.cwd(), "python": sys.executable})
+    write_files([
+        ("config/production.py", PRODUCTION_CONFIG),
+        ("uploadserverpro.service", service_content),
+        ("nginx-uploadserverpro.conf", NGINX_CONFIG),
+    ])
+
+def generate_self_signed_certificate(key_path, cert_path, days=365):
+    """Generate an RSA key and self-signed certificate in-process"""
+    from datetime import datetime, timedelta, timezone
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([
+        x509.NameAttribute(NameOID.COUNTRY_NAME, "US"),
+        x509.NameAttribute(NameOID.STATE_OR_PROVINCE_NAME, "State"),
+        x509.NameAttribute(NameOID.LOCALITY_NAME, "City"),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, "UploadServer"),
+        x509.NameAttribute(NameOID.COMMON_NAME, "localhost"),
+    ])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + timedelta(days=days))
+        .sign(key, hashes.SHA256())
+    )
+    
+    Path(key_path).write_bytes(key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    ))
+    Path(cert_path).write_bytes(cert.public_bytes(serialization.Encoding.PEM))
 
 def setup_ssl_certificates():
     """Generate self-signed SSL certificates for development"""
     print("\n🔐 Setting up SSL certificates...")
     
-    import subprocess
     try:
-        # Generate private key
-        subprocess.run([
-            "openssl", "genrsa", "-out", "ssl/uploadserver.key", "2048"
-        ], check=True, stdout=subprocess.DEVNULL)
-        
-        # Generate certificate
-        subprocess.run([
-            "openssl", "req", "-new", "-x509", "-key", "ssl/uploadserver.key",
-            "-out", "ssl/uploadserver.crt", "-days", "365",
-            "-subj", "/C=US/ST=State/L=City/O=UploadServer/CN=localhost"
-        ], check=True, stdout=subprocess.DEVNULL)
+        # Generate key and certificate without spawning openssl
+        generate_self_signed_certificate("ssl/uploadserver.key", "ssl/uploadserver.crt")
+    except ImportError:
+        import shutil
+        import subprocess
         
-        print("   ✅ Generated self-signed SSL certificate")
-        print("   ⚠️  For production, use certificates from a trusted CA")
+        openssl = shutil.which("openssl")
+        if not openssl:
+            print("   ⚠️  OpenSSL not found. Please install OpenSSL or provide certificates.")
+            return
         
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("   ⚠️  OpenSSL not found. Please install OpenSSL or provide certificates.")
+        try:
+            # Generate private key and certificate in one openssl call
+            subprocess.run([
+                openssl, "req", "-new", "-x509", "-newkey", "rsa:2048", "-nodes",
+                "-keyout", "ssl/uploadserver.key",
+                "-out", "ssl/uploadserver.crt", "-days", "365",
+                "-subj", "/C=US/ST=State/L=City/O=UploadServer/CN=localhost"
+            ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError:
+            print("   ⚠️  Could not generate certificate with OpenSSL. Please provide certificates.")
+            return
+    
+    print("   ✅ Generated self-signed SSL certificate")
+    print("   ⚠️  For production, use certificates from a trusted CA")
 
 def create_docker_files():
     """Create Docker configuration files"""
     print("\n🐳 Creating Docker files...")
     
     # Dockerfile
-    dockerfile = """FROM python:3.11-slim
+    dockerfile = """# syntax=docker/dockerfile:1.4
 
-# Install system dependencies
-RUN apt-get update && apt-get install -y \\
+# ---- Build stage: compilers and headers for native wheels ----
+FROM python:3.11-slim AS builder
+
+RUN --mount=type=cache,target=/var/cache/apt,sharing=locked \\
+    rm -f /etc/apt/apt.conf.d/docker-clean \\
+    && apt-get update && apt-get install -y --no-install-recommends \\
     gcc \\
     libpq-dev \\
-    libmagic1 \\
     libmagic-dev \\
     && rm -rf /var/lib/apt/lists/*
 
-# Set working directory
-WORKDIR /app
-
-# Copy requirements first
 COPY requirements.txt .
 
-# Install Python dependencies
-RUN pip install --no-cache-dir -r requirements.txt
+# Install Python dependencies into a prefix copied into the runtime stage
+# (wheel cache persists across builds)
+RUN --mount=type=cache,target=/root/.cache/pip \\
+    pip install --prefix=/install -r requirements.txt
+
+# ---- Runtime stage: shared libraries only ----
+FROM python:3.11-slim
+
+RUN --mount=type=cache,target=/var/cache/apt,sharing=locked \\
+    rm -f /etc/apt/apt.conf.d/docker-clean \\
+    && apt-get update && apt-get install -y --no-install-recommends \\
+    libpq5 \\
+    libmagic1 \\
+    curl \\
+    && rm -rf /var/lib/apt/lists/*
+
+COPY --from=builder /install /usr/local
+
+# Set working directory
+WORKDIR /app
 
 # Copy application
 COPY . .
@@ -334,13 +482,12 @@ EXPOSE 8000
 HEALTHCHECK --interval=30s --timeout=10s --start-period=5s --retries=3 \\
     CMD curl -f http://localhost:8000/health || exit 1
 
-# Start command
-CMD ["gunicorn", "--bind", "0.0.0.0:8000", "--workers", "4", "-k", "gevent", "uploadserver.advanced_server:app"]
+# Start command (one threaded worker per CPU unless WORKERS is set; --preload
+# shares imported code pages between forked workers and /dev/shm keeps worker
+# heartbeat files off the container filesystem)
+CMD ["sh", "-c", "exec gunicorn --bind 0.0.0.0:8000 --workers ${WORKERS:-$(nproc)} -k gthread --threads 8 --worker-tmp-dir /dev/shm --preload --keep-alive 5 --timeout 120 uploadserver.advanced_server:app"]
 """
     
-    with open("Dockerfile", "w") as f:
-        f.write(dockerfile)
-    
     # docker-compose.yml
     compose_file = """version: '3.8'
 
@@ -358,6 +505,8 @@ services:
       - SITE_NAME=${SITE_NAME:-UploadServer Pro}
       - ADMIN_EMAIL=${ADMIN_EMAIL:-admin@example.com}
       - WORKERS=${WORKERS:-4}
+      - DB_MAX_CONNECTIONS=200
+      - TRUSTED_PROXY_COUNT=${TRUSTED_PROXY_COUNT:-1}
       - MAX_UPLOAD_SIZE=${MAX_UPLOAD_SIZE:-100MB}
       - DEFAULT_QUOTA=${DEFAULT_QUOTA:-10GB}
     volumes:
@@ -378,6 +527,13 @@ services:
       POSTGRES_DB: uploadserver
       POSTGRES_USER: uploadserver
       POSTGRES_PASSWORD: password
+    command: >
+      postgres
+      -c shared_buffers=1GB
+      -c effective_cache_size=3GB
+      -c max_connections=200
+      -c work_mem=32MB
+      -c wal_compression=on
     volumes:
       - postgres_data:/var/lib/postgresql/data
     ports:
@@ -387,7 +543,7 @@ services:
     image: redis:7-alpine
     container_name: uploadserver-redis
     restart: unless-stopped
-    command: redis-server --appendonly yes
+    command: redis-server --appendonly yes --io-threads 4 --io-threads-do-reads yes --maxmemory-policy allkeys-lru
     volumes:
       - redis_data:/data
     ports:
@@ -412,33 +568,19 @@ volumes:
   redis_data:
 """
     
-    with open("docker-compose.prod.yml", "w") as f:
-        f.write(compose_file)
-    
-    print("   ✅ Created Dockerfile and docker-compose.prod.yml")
+    write_files([
+        ("Dockerfile", dockerfile),
+        ("docker-compose.prod.yml", compose_file),
+    ])
 
 def main():
     """Main deployment script"""
-    print("🚀 UploadServer Pro - Production Deployment Setup")
-    print("=" * 50)
+    print("🚀 UploadServer Pro - Production Deployment Setup\n" + "=" * 50)
     
     # Check system requirements
     if not check_system_requirements():
         sys.exit(1)
     
-    # Install dependencies
-    if not install_dependencies():
-        sys.exit(1)
-    
-    # Setup production environment
-    setup_production_environment()
-    
-    # Setup SSL certificates
-    setup_ssl_certificates()
-    
-    # Create Docker files
-    create_docker_files()
-    
     # Create requirements.txt
     requirements = """Flask>=2.3
 Flask-SocketIO>=5.3
@@ -452,7 +594,10 @@ celery>=5.2
 elasticsearch>=8.9
 boto3>=1.28
 whoosh>=2.7
+charset-normalizer>=3.0
+cachetools>=5.3
 passlib[bcrypt]>=1.7
+argon2-cffi>=23.1
 python-jose[cryptography]>=3.3
 python-multipart>=0.0.6
 gunicorn>=21.0
@@ -461,32 +606,28 @@ watchdog>=3.0
 psutil>=5.9
 python-magic>=0.4
 gevent>=23.9
+eventlet>=0.33
+orjson>=3.9
 PyPDF2>=3.0
 python-docx>=0.8.11
 """
     
-    with open("requirements.txt", "w") as f:
-        f.write(requirements)
-    
-    print("   ✅ Created requirements.txt")
-    
-    print(f"\n✅ Production setup complete!")
-    print(f"\n📋 Next steps:")
-    print(f"1. Review and update config/production.py")
-    print(f"2. Set environment variables (DATABASE_URL, SECRET_KEY, etc.)")
-    print(f"3. Install systemd service:")
-    print(f"   sudo cp uploadserverpro.service /etc/systemd/system/")
-    print(f"   sudo systemctl daemon-reload")
-    print(f"   sudo systemctl enable uploadserverpro")
-    print(f"   sudo systemctl start uploadserverpro")
-    print(f"4. Configure nginx:")
-    print(f"   sudo cp nginx-uploadserverpro.conf /etc/nginx/sites-available/")
-    print(f"   sudo ln -s /etc/nginx/sites-available/uploadserverpro.conf /etc/nginx/sites-enabled/")
-    print(f"   sudo nginx -t && sudo systemctl reload nginx")
-    print(f"5. Or use Docker:")
-    print(f"   docker-compose -f docker-compose.prod.yml up -d")
-    print(f"\n📚 Documentation: https://docs.uploadserverpro.com")
-    print(f"🐛 Issues: https://github.com/MuadzHdz/uploadserverpro/issues")
+    write_files([("requirements.txt", requirements)])
+    
+    # Install dependencies
+    if not install_dependencies("requirements.txt"):
+        sys.exit(1)
+    
+    # Setup production environment
+    setup_production_environment()
+    
+    # Setup SSL certificates
+    setup_ssl_certificates()
+    
+    # Create Docker files
+    create_docker_files()
+    
+    sys.stdout.write(NEXT_STEPS)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
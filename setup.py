@@ -1,9 +1,12 @@
 import re
 from setuptools import setup, find_packages
 
-with open("uploadserver/__init__.py", "r", encoding="utf-8") as f:
-    match = re.search(r'^__version__\s*=\s*[\'"]([^\'"]*)[\'"]', f.read(), re.MULTILINE)
-    version = match.group(1) if match else "2.0.0"
+VERSION_RE = re.compile(rb'^__version__\s*=\s*[\'"]([^\'"]*)[\'"]', re.MULTILINE)
+
+# __version__ sits at the top of the module; the first 2KB is enough
+with open("uploadserver/__init__.py", "rb") as f:
+    match = VERSION_RE.search(f.read(2048))
+    version = match.group(1).decode() if match else "2.0.0"
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
@@ -45,6 +48,7 @@ setup(
         "python-multipart>=0.0.6",
         "python-jose[cryptography]>=3.3",
         "passlib[bcrypt]>=1.7",
+        "argon2-cffi>=23.1",
         "celery>=5.2",
         "redis>=4.5",
         "elasticsearch>=8.9",
@@ -54,6 +58,8 @@ setup(
         "google-auth-oauthlib>=1.0",
         "Pillow>=9.5",
         "whoosh>=2.7",
+        "charset-normalizer>=3.0",
+        "cachetools>=5.3",
         "watchdog>=3.0",
         "schedule>=1.2",
         "psutil>=5.9",
@@ -61,6 +67,10 @@ setup(
         "PyPDF2>=3.0",
         "python-docx>=0.8.11",
     ],
+    extras_require={
+        # Only needed with SOCKETIO_ASYNC_MODE=eventlet
+        "eventlet": ["eventlet>=0.33"],
+    },
     entry_points={
         "console_scripts": [
             "uploadserver=uploadserver.advanced_server:main",
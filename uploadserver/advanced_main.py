@@ -2,82 +2,220 @@
 Main entry point for UploadServer Pro Enterprise
 """
 
-import sys
 import os
+
+# Socket.IO runs on real threads by default. SOCKETIO_ASYNC_MODE=eventlet opts
+# into green threads; the stdlib must then be patched before any other import
+# creates threads, locks or sockets
+ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE", "threading")
+if ASYNC_MODE == "eventlet":
+    try:
+        import eventlet
+
+        eventlet.monkey_patch()
+    except ImportError:
+        ASYNC_MODE = "threading"
+
+import sys
 import argparse
+import io
+import re
+import shutil
 import signal
 import threading
+import webbrowser
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timezone
 
-from uploadserver.advanced_server import create_app
-from uploadserver.models import db, SystemSettings
+from watchdog.observers import Observer
+from watchdog.events import PatternMatchingEventHandler
+from sqlalchemy.orm import selectinload
+
+from uploadserver.advanced_server import build_search_index, create_app
+from uploadserver.models import db, File, SystemSettings, User, UserSession
 from uploadserver.search_engine import SEARCH_ENGINE
 from uploadserver import __version__
 
-
-def setup_background_tasks(app):
-    """Setup background tasks for file monitoring and maintenance"""
+# Files written by the server itself, skipped by the file monitor
+MONITOR_IGNORE_PATTERNS = [
+    "*.db",
+    "*.db-journal",
+    "*.db-wal",
+    "*.db-shm",
+    "*.db.backup_*",
+    "*/search_index/*",
+]
+
+# Size string parsing ("100MB", "1.5 GB")
+SIZE_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*([A-Z]+)$")
+SIZE_UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+
+
+def setup_background_tasks(app, shutdown_event, directory, reindex=False):
+    """Setup background tasks for file monitoring, indexing and maintenance
+
+    Every task waits on ``shutdown_event`` between runs, so setting it wakes
+    them immediately and lets them exit cleanly instead of being killed
+    mid-backup when the process stops.
+    """
+
+    def initialize_search_index():
+        """Populate the search index while the server is already serving"""
+        print("🔍 Initializing search index in the background...")
+        # Same flock-guarded pass create_app would run, on the served directory
+        if build_search_index(app, directory, reindex=reindex):
+            print(f"✅ Search index initialized for: {directory}")
+        else:
+            print("⚠️  Warning: Could not initialize search index")
 
     def file_monitor():
         """Monitor file system changes and update search index"""
-        from watchdog.observers import Observer
-        from watchdog.events import FileSystemEventHandler
 
-        class FileChangeHandler(FileSystemEventHandler):
-            def on_modified(self, event):
-                if not event.is_directory:
-                    print(f"File modified: {event.src_path}")
-                    # Update search index in background
-
-            def on_created(self, event):
-                if not event.is_directory:
-                    print(f"File created: {event.src_path}")
-
-            def on_deleted(self, event):
-                if not event.is_directory:
-                    print(f"File deleted: {event.src_path}")
+        class FileChangeHandler(PatternMatchingEventHandler):
+            """Record the latest change per path; the monitor loop flushes them"""
+
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.pending = {}
+                self.lock = threading.Lock()
+                self.changed = threading.Event()
+
+            def record(self, event):
+                with self.lock:
+                    self.pending[event.src_path] = event.event_type
+                self.changed.set()
+
+            def drain(self):
+                with self.lock:
+                    pending, self.pending = self.pending, {}
+                    self.changed.clear()
+                return pending
+
+            def requeue(self, changes):
+                """Put back a batch that failed, keeping any newer events"""
+                with self.lock:
+                    for path, kind in changes.items():
+                        self.pending.setdefault(path, kind)
+                self.changed.set()
+
+            on_modified = on_created = on_deleted = record
+
+        def flush_changes(changes):
+            """Apply one debounced batch of changes to the search index
+
+            Returns False when the index update failed and should be retried.
+            """
+            upload_folder = app.config["UPLOAD_FOLDER"]
+            relative = {}
+            for path, kind in changes.items():
+                path = os.path.normpath(os.path.relpath(path, upload_folder))
+                # Uploads are indexed by the route that wrote them
+                if kind != "deleted" and SEARCH_ENGINE.is_server_write(path):
+                    continue
+                relative[path] = kind
+            if not relative:
+                return True
+
+            # Deleted files are dropped by path too, in case their row is gone
+            deleted_paths = [
+                path for path, kind in relative.items() if kind == "deleted"
+            ]
+
+            with app.app_context():
+                files = (
+                    File.query.options(selectinload(File.owner))
+                    .filter(File.file_path.in_(list(relative)))
+                    .all()
+                )
+                deleted_ids = [f.id for f in files if relative[f.file_path] == "deleted"]
+                updated = [f for f in files if relative[f.file_path] != "deleted"]
+                if files or deleted_paths:
+                    if not SEARCH_ENGINE.bulk_update(
+                        upload_folder, updated, deleted_ids, deleted_paths
+                    ):
+                        return False
+
+            counts = Counter(relative.values())
+            print(
+                "File changes: "
+                + ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items()))
+            )
+            return True
 
-        event_handler = FileChangeHandler()
+        # The database, its backups and the search index live in the upload
+        # folder too; every commit to them would otherwise flood the handler
+        event_handler = FileChangeHandler(
+            ignore_patterns=MONITOR_IGNORE_PATTERNS, ignore_directories=True
+        )
         observer = Observer()
         observer.schedule(event_handler, app.config["UPLOAD_FOLDER"], recursive=True)
         observer.start()
-        return observer
 
-    def cleanup_expired_sessions():
-        """Clean up expired user sessions"""
-        from uploadserver.models import UserSession
-        from datetime import datetime, timezone, timedelta
+        while not shutdown_event.is_set():
+            if not event_handler.changed.wait(1):
+                continue
 
-        while True:
+            # Debounce so bursts (e.g. extracting an archive) become one batch
+            shutdown_event.wait(0.2)
+            changes = event_handler.drain()
             try:
-                expired_sessions = UserSession.query.filter(
-                    UserSession.expires_at < datetime.now(timezone.utc)
-                ).all()
-
-                for session in expired_sessions:
-                    db.session.delete(session)
-
-                if expired_sessions:
-                    db.session.commit()
-                    print(f"Cleaned up {len(expired_sessions)} expired sessions")
+                flushed = flush_changes(changes)
+            except Exception as e:
+                print(f"Error updating search index: {e}")
+                flushed = False
 
-                # Sleep for 1 hour before next cleanup
-                import time
+            if not flushed:
+                # Retry the batch shortly instead of losing the update
+                event_handler.requeue(changes)
+                shutdown_event.wait(5)
 
-                time.sleep(3600)
+        observer.stop()
+        observer.join()
 
-            except Exception as e:
-                print(f"Error in session cleanup: {e}")
-                import time
-
-                time.sleep(300)  # Retry in 5 minutes
+    def cleanup_expired_sessions():
+        """Clean up expired user sessions"""
+        with app.app_context():
+            while True:
+                try:
+                    # Delete in bounded slices so each transaction stays short and
+                    # an interrupted run still keeps the batches already committed.
+                    # SQLite has no DELETE ... LIMIT, hence the id subquery.
+                    setting = SystemSettings.query.get("session_cleanup_batch_size")
+                    batch_size = setting.value if setting else 10000
+                    now = datetime.now(timezone.utc)
+
+                    deleted = 0
+                    while True:
+                        expired_ids = (
+                            db.select(UserSession.id)
+                            .where(UserSession.expires_at < now)
+                            .limit(batch_size)
+                        )
+                        count = UserSession.query.filter(
+                            UserSession.id.in_(expired_ids)
+                        ).delete(synchronize_session=False)
+                        db.session.commit()
+                        deleted += count
+                        if count < batch_size:
+                            break
+
+                    if deleted:
+                        print(f"Cleaned up {deleted} expired sessions")
+
+                    interval = 3600  # Run again in 1 hour
+
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error in session cleanup: {e}")
+                    interval = 300  # Retry in 5 minutes
+
+                if shutdown_event.wait(interval):
+                    return
 
     def backup_database():
         """Periodic database backup"""
-        import shutil
-        from datetime import datetime
-
         while True:
             try:
                 if hasattr(app, "config") and "SQLALCHEMY_DATABASE_URI" in app.config:
@@ -86,31 +224,62 @@ def setup_background_tasks(app):
                     )
                     if os.path.exists(db_path):
                         backup_path = f"{db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                        shutil.copy2(db_path, backup_path)
+                        backup_sqlite_database(db_path, backup_path)
                         print(f"Database backed up to {backup_path}")
 
-                # Sleep for 24 hours before next backup
-                import time
-
-                time.sleep(86400)
+                interval = 86400  # Run again in 24 hours
 
             except Exception as e:
                 print(f"Error in database backup: {e}")
-                import time
+                interval = 3600  # Retry in 1 hour
+
+            if shutdown_event.wait(interval):
+                return
 
-                time.sleep(3600)  # Retry in 1 hour
+    def reconcile_storage_usage():
+        """Nightly correction of User.storage_used drift from the files table"""
+        with app.app_context():
+            while True:
+                try:
+                    # Single correlated UPDATE for every user
+                    usage = (
+                        db.select(db.func.coalesce(db.func.sum(File.file_size), 0))
+                        .where(File.owner_id == User.id)
+                        .scalar_subquery()
+                    )
+                    db.session.execute(db.update(User).values(storage_used=usage))
+                    db.session.commit()
 
-    # Start background threads
-    file_monitor_thread = threading.Thread(target=file_monitor, daemon=True)
-    file_monitor_thread.start()
+                    interval = 86400  # Run again in 24 hours
 
-    cleanup_thread = threading.Thread(target=cleanup_expired_sessions, daemon=True)
-    cleanup_thread.start()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error reconciling storage usage: {e}")
+                    interval = 3600  # Retry in 1 hour
 
-    backup_thread = threading.Thread(target=backup_database, daemon=True)
-    backup_thread.start()
+                if shutdown_event.wait(interval):
+                    return
+
+    def optimize_search_index():
+        """Nightly merge of the segments left behind by indexing"""
+        while True:
+            if shutdown_event.wait(86400):
+                return
+            SEARCH_ENGINE.optimize_index()
+
+    # Start background threads
+    threads = [
+        threading.Thread(target=initialize_search_index, daemon=True),
+        threading.Thread(target=file_monitor, daemon=True),
+        threading.Thread(target=cleanup_expired_sessions, daemon=True),
+        threading.Thread(target=backup_database, daemon=True),
+        threading.Thread(target=reconcile_storage_usage, daemon=True),
+        threading.Thread(target=optimize_search_index, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
 
-    return file_monitor_thread
+    return threads
 
 
 def main():
@@ -158,6 +327,19 @@ def main():
         help="Open the server URL in a web browser automatically.",
     )
 
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Do not print the startup banner.",
+    )
+
+    parser.add_argument(
+        "--qr",
+        action="store_true",
+        help="Print a QR code of the server URL for mobile access.",
+    )
+
     parser.add_argument(
         "--debug", action="store_true", help="Enable debug mode with detailed logging."
     )
@@ -169,6 +351,12 @@ def main():
         help="Enable development mode with auto-reload.",
     )
 
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile every request with werkzeug's ProfilerMiddleware.\nProfiles are written to <directory>/profiles.",
+    )
+
     parser.add_argument(
         "--workers",
         type=int,
@@ -209,6 +397,12 @@ def main():
         help="Database connection URL.\n[default: sqlite:///<directory>/uploadserver.db]",
     )
 
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Rebuild the search index for all files on startup using every CPU core.",
+    )
+
     parser.add_argument(
         "--redis-url",
         default="redis://localhost:6379/0",
@@ -240,7 +434,7 @@ def main():
     args = parser.parse_args()
 
     # Create app
-    app = create_app()
+    app = create_app(async_mode=ASYNC_MODE, build_index=False)
 
     # Configure app with command line args
     app.config["MAX_CONTENT_LENGTH"] = parse_size(args.max_upload_size)
@@ -266,14 +460,6 @@ def main():
             }
         )
 
-        # Initialize search index
-        print("🔍 Initializing search index...")
-        try:
-            SEARCH_ENGINE.index_directory(args.directory)
-            print(f"✅ Search index initialized for: {args.directory}")
-        except Exception as e:
-            print(f"⚠️  Warning: Could not initialize search index: {e}")
-
     # Setup password if provided
     if args.password:
         from getpass import getpass
@@ -288,8 +474,6 @@ def main():
             admin_password = args.password
 
         # Create or update admin user
-        from uploadserver.models import User
-
         with app.app_context():
             admin_user = User.query.filter_by(username="admin").first()
             if not admin_user:
@@ -313,62 +497,41 @@ def main():
     host = args.bind if args.bind != "0.0.0.0" else get_local_ip()
     url = f"http://{host}:{args.port}"
 
-    print(f"""
-🚀 UploadServer Pro v{__version__} Starting...
-
-🌐 Server Information:
-   URL: {url}
-   Directory: {args.directory}
-   Port: {args.port}
-   Host: {host}
-   Workers: {args.workers}
-   Debug: {args.debug}
-   Dev Mode: {args.dev_mode}
-
-🔧 Features Enabled:
-   User Registration: {"✅" if args.enable_registration else "❌"}
-   File Sharing: {"✅" if args.enable_file_sharing else "❌"}
-   Search Engine: ✅
-   Real-time Collaboration: ✅
-   Multi-user Support: ✅
-   File Versioning: ✅
-   Admin Dashboard: ✅
-   API Endpoints: ✅
+    if not args.quiet:
+        sys.stdout.write(startup_banner(args, host, url))
+        sys.stdout.flush()
 
-💾 Storage Configuration:
-   Max Upload Size: {args.max_upload_size}
-   Default User Quota: {args.storage_quota}
-   Database: {"SQLite (built-in)" if not args.database_url else args.database_url}
-   Search Index: {"Whoosh (built-in)" if not args.elasticsearch_url else "Elasticsearch"}
-
-📁 Directory Structure:
-   Upload Directory: {args.directory}
-   Database: {args.database_url or f"sqlite:///{args.directory}/uploadserver.db"}
-   Search Index: {args.directory}/search_index
-   Logs: {args.directory}/logs
-""")
-
-    try:
-        import qrcode
-
-        print(f"\n📱 Scan QR code to connect from mobile:")
-        qr = qrcode.QRCode()
-        qr.add_data(url)
-        qr.make(fit=True)
-        qr.print_ascii(tty=True)
-    except ImportError:
-        print("\n📱 Install 'qrcode[pil]' for QR code support: pip install qrcode[pil]")
-    except Exception as e:
-        print(f"\n⚠️  Could not generate QR code: {e}")
+    if args.qr:
+        try:
+            import qrcode
+
+            # Render into a buffer and emit it with a single write
+            qr = qrcode.QRCode()
+            qr.add_data(url)
+            qr.make(fit=True)
+            buffer = io.StringIO()
+            qr.print_ascii(out=buffer)
+            sys.stdout.write(
+                f"\n📱 Scan QR code to connect from mobile:\n{buffer.getvalue()}"
+            )
+            sys.stdout.flush()
+        except ImportError:
+            print("\n📱 Install 'qrcode[pil]' for QR code support: pip install qrcode[pil]")
+        except Exception as e:
+            print(f"\n⚠️  Could not generate QR code: {e}")
 
     # Setup background tasks
-    file_monitor = setup_background_tasks(app)
+    shutdown_event = threading.Event()
+    background_threads = setup_background_tasks(
+        app, shutdown_event, args.directory, reindex=args.reindex
+    )
 
     # Graceful shutdown handler
     def signal_handler(signum, frame):
         print(f"\n🛑 Shutting down gracefully...")
-        if file_monitor:
-            file_monitor.stop()
+        shutdown_event.set()
+        for thread in background_threads:
+            thread.join(timeout=5)
         db.session.remove()
         sys.exit(0)
 
@@ -377,21 +540,28 @@ def main():
 
     # Open browser if requested
     if args.open:
-        import webbrowser
-        import threading
-
-        threading.Timer(1, lambda: webbrowser.open(url)).start()
+        threading.Timer(1.0, webbrowser.open, args=(url,)).start()
 
     # Start server
     print(f"\n🎯 Server starting at {url}")
     print("Press Ctrl+C to stop the server")
 
     try:
-        if args.dev_mode:
-            # Development server with auto-reload
+        if args.profile:
+            # Per-request cProfile, bounded to the top 30 entries per request
             from werkzeug.middleware.profiler import ProfilerMiddleware
 
-            app.wsgi_app = ProfilerMiddleware(app.wsgi_app)
+            profile_dir = os.path.join(args.directory, "profiles")
+            os.makedirs(profile_dir, exist_ok=True)
+            app.wsgi_app = ProfilerMiddleware(
+                app.wsgi_app,
+                profile_dir=profile_dir,
+                restrictions=[30],
+                sort_by=("cumulative",),
+            )
+
+        if args.dev_mode:
+            # Development server with auto-reload
             app.run(
                 host=args.bind,
                 port=args.port,
@@ -413,7 +583,15 @@ def main():
                 )
                 return
 
-            app.run(host=args.bind, port=args.port, debug=args.debug, threaded=True)
+            if ASYNC_MODE == "eventlet":
+                # eventlet.wsgi server with cooperative sockets
+                app.extensions["socketio"].run(
+                    app, host=args.bind, port=args.port, debug=args.debug
+                )
+            else:
+                app.run(
+                    host=args.bind, port=args.port, debug=args.debug, threaded=True
+                )
 
     except KeyboardInterrupt:
         print("\n👋 Server stopped by user")
@@ -422,8 +600,47 @@ def main():
         sys.exit(1)
 
 
+def startup_banner(args, host, url):
+    """Build the startup banner; only evaluated when it will be printed."""
+    return f"""
+🚀 UploadServer Pro v{__version__} Starting...
+
+🌐 Server Information:
+   URL: {url}
+   Directory: {args.directory}
+   Port: {args.port}
+   Host: {host}
+   Workers: {args.workers}
+   Debug: {args.debug}
+   Dev Mode: {args.dev_mode}
+
+🔧 Features Enabled:
+   User Registration: {"✅" if args.enable_registration else "❌"}
+   File Sharing: {"✅" if args.enable_file_sharing else "❌"}
+   Search Engine: ✅
+   Real-time Collaboration: ✅
+   Multi-user Support: ✅
+   File Versioning: ✅
+   Admin Dashboard: ✅
+   API Endpoints: ✅
+
+💾 Storage Configuration:
+   Max Upload Size: {args.max_upload_size}
+   Default User Quota: {args.storage_quota}
+   Database: {"SQLite (built-in)" if not args.database_url else args.database_url}
+   Search Index: {"Whoosh (built-in)" if not args.elasticsearch_url else "Elasticsearch"}
+
+📁 Directory Structure:
+   Upload Directory: {args.directory}
+   Database: {args.database_url or f"sqlite:///{args.directory}/uploadserver.db"}
+   Search Index: {args.directory}/search_index
+   Logs: {args.directory}/logs
+"""
+
+
+@lru_cache(maxsize=1)
 def get_local_ip():
-    """Get local IP address."""
+    """Get local IP address (resolved once per process)."""
     try:
         import socket
 
@@ -436,34 +653,79 @@ def get_local_ip():
 
 def parse_size(size_str):
     """Parse size string like '100MB' to bytes."""
-    import re
-
-    size_str = size_str.upper().strip()
-
-    # Define conversion factors
-    units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
-
-    # Extract number and unit
-    match = re.match(r"^(\d+(?:\.\d+)?)\s*([A-Z]+)$", size_str)
+    match = SIZE_RE.match(size_str.upper().strip())
     if not match:
         return 100 * 1024 * 1024  # Default to 100MB
 
     number = float(match.group(1))
     unit = match.group(2)
 
-    return int(number * units.get(unit, 1))
+    return int(number * SIZE_UNITS.get(unit, 1))
+
+
+def backup_sqlite_database(db_path, backup_path):
+    """Copy a live SQLite database with the online backup API.
+
+    Pages are copied in steps of 1024 so concurrent writers are only blocked
+    briefly, and the snapshot stays consistent even while the WAL is active.
+    """
+    try:
+        import sqlite3
+    except ImportError:
+        # Interpreter built without sqlite3: fall back to a raw file copy
+        copy_database_file(db_path, backup_path)
+        return
+
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(backup_path)
+    try:
+        with target:
+            source.backup(target, pages=1024, sleep=0.01)
+    finally:
+        target.close()
+        source.close()
+
+
+def copy_database_file(db_path, backup_path):
+    """Copy a database file in-kernel, preserving its timestamps."""
+    if hasattr(os, "copy_file_range"):
+        # Linux: copy_file_range moves data without a userspace buffer
+        with open(db_path, "rb") as source, open(backup_path, "wb") as target:
+            remaining = os.fstat(source.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(
+                    source.fileno(), target.fileno(), min(remaining, 1 << 30)
+                )
+                if copied == 0:
+                    break
+                remaining -= copied
+        shutil.copystat(db_path, backup_path)
+    else:
+        shutil.copy2(db_path, backup_path)
 
 
 def update_system_settings(settings):
     """Update system settings in database."""
+    # One SELECT for every key instead of a lookup per setting
+    existing = {
+        setting.key: setting
+        for setting in SystemSettings.query.filter(
+            SystemSettings.key.in_(list(settings))
+        )
+    }
+    now = datetime.now(timezone.utc)
+
+    new_settings = []
     for key, value in settings.items():
-        setting = SystemSettings.query.get(key)
+        setting = existing.get(key)
         if setting:
             setting.value = value
-            setting.updated_at = datetime.now(timezone.utc)
+            setting.updated_at = now
         else:
-            setting = SystemSettings(key=key, value=value)
-            db.session.add(setting)
+            new_settings.append(SystemSettings(key=key, value=value))
+
+    # New rows go out as a single batched INSERT on flush
+    db.session.add_all(new_settings)
     db.session.commit()
 
 
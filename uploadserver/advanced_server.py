@@ -11,9 +11,15 @@ import webbrowser
 import mimetypes
 import json
 import hashlib
+import hmac
+import shutil
+import queue
+import tempfile
+import time
 import uuid
-from datetime import datetime, timezone
-from functools import wraps
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime, timezone
+from functools import lru_cache, wraps
 from getpass import getpass
 from pathlib import Path
 
@@ -28,6 +34,9 @@ from flask import (
     session,
     jsonify,
     abort,
+    Response,
+    stream_with_context,
+    g,
 )
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_login import (
@@ -39,10 +48,12 @@ from flask_login import (
     current_user,
 )
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import desc, asc, and_, or_
+from werkzeug.security import generate_password_hash, check_password_hash, safe_join
+from sqlalchemy import desc, asc, and_, or_, event
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 from uploadserver import __version__
 
@@ -54,6 +65,18 @@ try:
 except ImportError:
     QR_AVAILABLE = False
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 try:
     from flask import Flask
     from werkzeug.utils import secure_filename
@@ -77,11 +100,24 @@ from .models import (
     Comment,
     UserSession,
     SystemSettings,
+    DailyUserStats,
+    DailyFileStats,
+    MIME_CATEGORY_PREFIXES,
+    mime_category_for,
+)
+from .search_engine import SEARCH_ENGINE, sniff_mime
+from .api_routes import (
+    invalidate_storage_info,
+    queue_activity,
+    start_activity_writer,
 )
-from .search_engine import SearchEngine
 
 UPLOAD_DIRECTORY = os.getcwd()
-SEARCH_ENGINE = SearchEngine()
+ANALYTICS_QUEUE = queue.Queue()
+PREVIEW_SNIPPET_SIZE = 64 * 1024
+LOGIN_ATTEMPTS_PER_MINUTE = 5
+# Seconds to wait between failed startup indexing attempts
+INDEX_RETRY_DELAYS = (5, 30, 120)
 
 login_manager = LoginManager()
 
@@ -103,8 +139,12 @@ def admin_required(f):
     return decorated_function
 
 
-def create_app():
-    """Creates and configures the Flask application."""
+def create_app(async_mode="threading", build_index=True):
+    """Creates and configures the Flask application.
+
+    Pass ``build_index=False`` when the caller starts its own indexing pass
+    through ``build_search_index``.
+    """
     if not FLASK_AVAILABLE:
         print(
             "Fatal: Flask is not installed. Please run 'pip install Flask Werkzeug qrcode[pil] flask-socketio flask-sqlalchemy flask-login'."
@@ -113,50 +153,160 @@ def create_app():
 
     app = Flask(__name__)
 
+    # Behind a reverse proxy, take the client address from X-Forwarded-For
+    # so per-IP limits see real clients rather than the proxy
+    trusted_proxies = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+    if trusted_proxies:
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies
+        )
+
     # Configuration
     app.config["UPLOAD_FOLDER"] = UPLOAD_DIRECTORY
-    app.config["SECRET_KEY"] = os.urandom(24)
+    # Resolved once; request paths are joined onto it with safe_join
+    upload_root = os.path.realpath(UPLOAD_DIRECTORY)
+    app.config["SECRET_KEY"] = load_secret_key(app.instance_path)
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
         "DATABASE_URL", f"sqlite:///{os.path.join(UPLOAD_DIRECTORY, 'uploadserver.db')}"
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    is_sqlite = app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_pre_ping": True}
+    if is_sqlite:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"]["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": 30,
+        }
+    else:
+        # Each worker process has its own pool, so split the server's
+        # connection limit between workers, keeping some for admin sessions.
+        # Connections are recycled before server-side idle timeouts and
+        # checkouts fail fast rather than queueing forever.
+        workers = int(os.getenv("WORKERS") or os.cpu_count() or 1)
+        max_connections = int(os.getenv("DB_MAX_CONNECTIONS", "200"))
+        budget = max(4, (max_connections - 20) // workers)
+        pool_size = int(os.getenv("DB_POOL_SIZE", budget * 2 // 3))
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"].update(
+            pool_size=pool_size,
+            max_overflow=max(0, budget - pool_size),
+            pool_recycle=1800,
+            pool_timeout=10,
+        )
+        if app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgres"):
+            # Stop one runaway query from holding a connection indefinitely
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"]["connect_args"] = {
+                "options": "-c statement_timeout=15000"
+            }
     app.config["MAX_CONTENT_LENGTH"] = 100 * 1024 * 1024  # 100MB max file size
+    # Let a fronting web server stream downloads with sendfile(2)
+    app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
 
     # Initialize extensions
-    socketio = SocketIO(cors_allowed_origins="*")
+    socketio = SocketIO(
+        cors_allowed_origins="*", json=OrjsonModule if ORJSON_AVAILABLE else json
+    )
     login_manager = LoginManager()
     login_manager.login_view = "login"
     db.init_app(app)
-    socketio.init_app(app, async_mode="threading")
+    socketio.init_app(app, async_mode=async_mode)
     login_manager.init_app(app)
 
     with app.app_context():
+        if is_sqlite:
+            event.listen(db.engine, "connect", set_sqlite_pragmas)
+
         # Create tables
         db.create_all()
 
+        # Move PostgreSQL databases created with VARCHAR ids to native uuid
+        convert_uuid_columns()
+
         # Initialize system settings
         init_system_settings()
 
-        # Initialize search index
-        SEARCH_ENGINE.index_directory(UPLOAD_DIRECTORY)
+        # Add and backfill File.mime_category on databases created before it
+        backfill_mime_categories()
+
+        # create_all() skips indexes on tables that already exist
+        create_missing_indexes()
+
+        # Seed the daily counters from rows created before they existed
+        backfill_daily_stats()
+
+    # Activity rows are written in bulk by a background thread
+    start_activity_writer(app)
+
+    # Build the search index without blocking startup
+    if build_index:
+        threading.Thread(
+            target=build_search_index, args=(app, UPLOAD_DIRECTORY), daemon=True
+        ).start()
+
+    # Coalesce upload notifications into one event per room
+    upload_events = UploadEventBuffer()
+
+    def flush_upload_events():
+        while True:
+            # Sleep until an upload arrives, then let a burst collect
+            upload_events.has_pending.wait()
+            socketio.sleep(0.05)
+            for room, events in upload_events.drain().items():
+                socketio.emit("files_uploaded", events, room=room)
+
+    socketio.start_background_task(flush_upload_events)
+
+    # Write download analytics off the request path
+    threading.Thread(
+        target=record_download_analytics, args=(app, ANALYTICS_QUEUE), daemon=True
+    ).start()
+
+    @app.before_request
+    def load_theme():
+        g.theme = request.cookies.get("theme", "tokyo-night")
+
+    @app.context_processor
+    def inject_theme():
+        return {"theme": g.get("theme", "tokyo-night")}
 
     # ===== AUTHENTICATION ROUTES =====
 
+    login_limiter = LoginRateLimiter(LOGIN_ATTEMPTS_PER_MINUTE)
+
+    @lru_cache(maxsize=1)
+    def get_admin_user_id():
+        admin_user = User.query.filter_by(username="admin").first()
+        return admin_user.id if admin_user else None
+
     @app.route("/login", methods=["GET", "POST"])
     def login():
         if request.method == "POST":
+            # Reject brute-force bursts before touching the database or hashing;
+            # only failed attempts count towards the limit
+            if not login_limiter.allow(request.remote_addr):
+                flash("Too many login attempts. Please try again later.", "error")
+                return render_template("login.html"), 429
+
             username = request.form.get("username", "").strip()
             password = request.form.get("password", "")
             remember = request.form.get("remember", False)
 
             if not username or not password:
                 flash("Username and password are required.", "error")
-                return render_template("login.html", theme="tokyo-night")
+                return render_template("login.html")
 
             # Check for admin fallback password
-            if PASSWORD and username == "admin" and password == PASSWORD:
+            if (
+                PASSWORD
+                and username == "admin"
+                and hmac.compare_digest(password.encode(), PASSWORD.encode())
+            ):
                 # Create temp admin user if not exists
-                admin_user = User.query.filter_by(username="admin").first()
+                admin_id = get_admin_user_id()
+                admin_user = db.session.get(User, admin_id) if admin_id else None
                 if not admin_user:
                     admin_user = User(
                         username="admin",
@@ -167,6 +317,7 @@ def create_app():
                     admin_user.set_password(PASSWORD)
                     db.session.add(admin_user)
                     db.session.commit()
+                    get_admin_user_id.cache_clear()
 
                 login_user(admin_user, remember=remember)
                 flash("Login successful!", "success")
@@ -181,16 +332,9 @@ def create_app():
                     user.last_login = datetime.now(timezone.utc)
                     db.session.commit()
 
-                    # Log activity
-                    activity = Activity(
-                        user_id=user.id,
-                        action="login",
-                        details={"ip": request.remote_addr},
-                        ip_address=request.remote_addr,
-                        user_agent=request.headers.get("User-Agent"),
+                    queue_activity(
+                        "login", {"ip": request.remote_addr}, user_id=user.id
                     )
-                    db.session.add(activity)
-                    db.session.commit()
 
                     flash(f"Welcome back, {user.username}!", "success")
                     next_url = request.args.get("next")
@@ -198,24 +342,16 @@ def create_app():
                 else:
                     flash("Account is disabled. Please contact administrator.", "error")
             else:
+                login_limiter.record_failure(request.remote_addr)
                 flash("Invalid username or password.", "error")
 
-        theme = request.cookies.get("theme", "tokyo-night")
-        return render_template("login.html", theme=theme)
+        return render_template("login.html")
 
     @app.route("/logout")
     @login_required
     def logout():
         # Log activity
-        activity = Activity(
-            user_id=current_user.id,
-            action="logout",
-            details={"ip": request.remote_addr},
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get("User-Agent"),
-        )
-        db.session.add(activity)
-        db.session.commit()
+        queue_activity("logout", {"ip": request.remote_addr})
 
         logout_user()
         flash("You have been logged out.", "success")
@@ -233,24 +369,24 @@ def create_app():
             # Validation
             if not all([username, email, password, full_name]):
                 flash("All fields are required.", "error")
-                return render_template("register.html", theme="tokyo-night")
+                return render_template("register.html")
 
             if password != confirm_password:
                 flash("Passwords do not match.", "error")
-                return render_template("register.html", theme="tokyo-night")
+                return render_template("register.html")
 
             if len(password) < 8:
                 flash("Password must be at least 8 characters long.", "error")
-                return render_template("register.html", theme="tokyo-night")
+                return render_template("register.html")
 
             # Check if user exists
             if User.query.filter_by(username=username).first():
                 flash("Username already exists.", "error")
-                return render_template("register.html", theme="tokyo-night")
+                return render_template("register.html")
 
             if User.query.filter_by(email=email).first():
                 flash("Email already exists.", "error")
-                return render_template("register.html", theme="tokyo-night")
+                return render_template("register.html")
 
             # Create user
             try:
@@ -272,8 +408,7 @@ def create_app():
                 db.session.rollback()
                 flash("Username or email already exists.", "error")
 
-        theme = request.cookies.get("theme", "tokyo-night")
-        return render_template("register.html", theme=theme)
+        return render_template("register.html")
 
     # ===== MAIN APPLICATION ROUTES =====
 
@@ -310,7 +445,6 @@ def create_app():
             else 0
         )
 
-        theme = request.cookies.get("theme", "tokyo-night")
         return render_template(
             "dashboard.html",
             total_files=total_files,
@@ -318,7 +452,6 @@ def create_app():
             storage_percent=storage_percent,
             recent_files=recent_files,
             recent_activities=recent_activities,
-            theme=theme,
         )
 
     @app.route("/browse/")
@@ -335,20 +468,24 @@ def create_app():
             flash("Access denied.", "error")
             return redirect(url_for("dashboard"))
 
-        current_dir = os.path.join(UPLOAD_DIRECTORY, path)
+        current_dir = safe_join(upload_root, path)
 
-        if not os.path.isdir(current_dir) or not os.path.abspath(
-            current_dir
-        ).startswith(os.path.abspath(UPLOAD_DIRECTORY)):
+        if current_dir is None or not os.path.isdir(current_dir):
             flash("Error: Invalid or inaccessible directory.", "error")
             return redirect(url_for("browse", path=current_user.username))
 
         try:
-            items = os.listdir(current_dir)
-            dirs = [d for d in items if os.path.isdir(os.path.join(current_dir, d))]
-            files = [f for f in items if os.path.isfile(os.path.join(current_dir, f))]
-            dirs.sort(key=lambda d: d.lower())
-            files.sort(key=lambda f: f.lower())
+            # scandir reports entry types from the directory listing itself,
+            # avoiding a stat() per entry
+            dirs, files = [], []
+            with os.scandir(current_dir) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+            dirs.sort(key=str.lower)
+            files.sort(key=str.lower)
         except OSError:
             dirs, files = [], []
             flash("Error: Could not read directory contents.", "error")
@@ -360,8 +497,6 @@ def create_app():
             owner_id=current_user.id, parent_directory=path
         ).all()
 
-        theme = request.cookies.get("theme", "tokyo-night")
-
         return render_template(
             "index.html",
             files=files,
@@ -369,7 +504,6 @@ def create_app():
             current_path=path,
             parent_dir=parent_dir,
             db_files=db_files,
-            theme=theme,
         )
 
     # ===== FILE OPERATIONS =====
@@ -394,49 +528,47 @@ def create_app():
                 flash("Invalid filename.", "error")
                 return redirect(url_for("browse", path=path))
 
-            # Check storage quota
-            current_size = (
-                db.session.query(db.func.sum(File.file_size))
-                .filter_by(owner_id=current_user.id)
-                .scalar()
-                or 0
-            )
-            file_size = len(file.read())
-            file.seek(0)  # Reset file pointer
+            # Check storage quota against the maintained usage counter
+            current_size = current_user.storage_used or 0
+            # Measure the upload by seeking instead of reading it into memory
+            file.stream.seek(0, os.SEEK_END)
+            file_size = file.stream.tell()
+            file.stream.seek(0)
 
             if current_size + file_size > current_user.storage_quota:
                 flash("Storage quota exceeded.", "error")
                 return redirect(url_for("browse", path=path))
 
-            upload_path = os.path.join(app.config["UPLOAD_FOLDER"], path, filename)
-
             # Security check
-            if not os.path.abspath(upload_path).startswith(
-                os.path.abspath(app.config["UPLOAD_FOLDER"])
-            ):
+            upload_path = safe_join(upload_root, path, filename)
+            if upload_path is None:
                 flash("Invalid path.", "error")
                 return redirect(url_for("browse", path=path))
 
             try:
-                # Calculate file hash
-                file_hash = hashlib.sha256()
-                while chunk := file.read(8192):
-                    file_hash.update(chunk)
-                final_hash = file_hash.hexdigest()
+                # This route indexes the upload itself; keep the file
+                # monitor from indexing it a second time
+                SEARCH_ENGINE.mark_server_write(os.path.join(path, filename))
 
-                file.seek(0)
-                file.save(upload_path)
+                # Hash the upload while it is written to disk (single pass)
+                reader = HashingReader(file.stream)
+                with open(upload_path, "wb") as target:
+                    shutil.copyfileobj(reader, target, 1024 * 1024)
+                final_hash = reader.hash.hexdigest()
+                file_size = reader.size
 
                 # Get MIME type
-                mime_type, _ = mimetypes.guess_type(upload_path)
+                mime_type = guess_mime_type(upload_path)
 
                 # Create database record
                 db_file = File(
+                    id=str(uuid.uuid4()),
                     filename=filename,
                     original_filename=file.filename,
                     file_path=os.path.join(path, filename),
                     file_size=file_size,
                     mime_type=mime_type,
+                    mime_category=mime_category_for(mime_type),
                     file_hash=final_hash,
                     owner_id=current_user.id,
                     parent_directory=path,
@@ -448,34 +580,32 @@ def create_app():
                 )
                 db.session.add(db_file)
 
-                # Update user storage
-                current_user.storage_used = current_size + file_size
-
-                # Log activity
-                activity = Activity(
-                    user_id=current_user.id,
-                    file_id=db_file.id,
-                    action="upload",
-                    details={"file_size": file_size, "filename": filename},
-                    ip_address=request.remote_addr,
-                    user_agent=request.headers.get("User-Agent"),
+                # Update user storage atomically in the database
+                User.query.filter_by(id=current_user.id).update(
+                    {"storage_used": User.storage_used + file_size}
                 )
-                db.session.add(activity)
 
+                # Single commit for file and quota
                 db.session.commit()
 
-                # Update search index
-                SEARCH_ENGINE.index_file(db_file)
+                queue_activity(
+                    "upload",
+                    {"file_size": file_size, "filename": filename},
+                    file_id=db_file.id,
+                )
+
+                # Update search index and cached storage breakdown
+                SEARCH_ENGINE.index_file(db_file, owner_username=current_user.username)
+                invalidate_storage_info(current_user.id)
 
-                # Emit WebSocket event
-                socketio.emit(
-                    "file_uploaded",
+                # Queue WebSocket event for the next batched emit
+                upload_events.add(
+                    f"user_{current_user.id}",
                     {
                         "file": db_file.to_dict(),
                         "user_id": current_user.id,
                         "timestamp": datetime.now(timezone.utc).isoformat(),
                     },
-                    room=f"user_{current_user.id}",
                 )
 
                 flash(f'File "{filename}" uploaded successfully!', "success")
@@ -498,30 +628,25 @@ def create_app():
             flash("File not found.", "error")
             return redirect(url_for("browse"))
 
-        file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        if not os.path.isfile(file_path):
+        file_path = safe_join(upload_root, filename)
+        if file_path is None or not os.path.isfile(file_path):
             flash("File not found.", "error")
             return redirect(url_for("browse"))
 
-        # Update download count and last accessed
-        file_obj.download_count += 1
-        file_obj.last_accessed = datetime.now(timezone.utc)
-        db.session.commit()
-
-        # Log activity
-        activity = Activity(
-            user_id=current_user.id,
-            file_id=file_obj.id,
-            action="download",
-            details={"filename": file_obj.filename},
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get("User-Agent"),
+        # Queue download count and activity for the analytics writer
+        ANALYTICS_QUEUE.put(
+            {
+                "user_id": current_user.id,
+                "file_id": file_obj.id,
+                "action": "download",
+                "details": {"filename": file_obj.filename},
+                "ip_address": request.remote_addr,
+                "user_agent": request.headers.get("User-Agent"),
+            }
         )
-        db.session.add(activity)
-        db.session.commit()
 
         # Detect MIME type
-        mime_type, _ = mimetypes.guess_type(file_path)
+        mime_type = guess_mime_type(file_path)
         if mime_type is None:
             mime_type = "application/octet-stream"
 
@@ -530,6 +655,8 @@ def create_app():
             filename,
             mimetype=mime_type,
             as_attachment=True,
+            conditional=True,
+            etag=file_obj.file_hash or True,
         )
 
     @app.route("/preview/<path:filename>")
@@ -545,13 +672,13 @@ def create_app():
             return redirect(url_for("browse"))
 
         # Get file info
-        file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        if not os.path.isfile(file_path):
+        file_path = safe_join(upload_root, filename)
+        if file_path is None or not os.path.isfile(file_path):
             flash("File not found.", "error")
             return redirect(url_for("browse"))
 
         file_stat = os.stat(file_path)
-        mime_type, _ = mimetypes.guess_type(file_path)
+        mime_type = guess_mime_type(file_path)
 
         # Determine preview capability
         is_text = (
@@ -564,37 +691,50 @@ def create_app():
         is_image = mime_type and mime_type.startswith("image/")
 
         content = None
-        if is_text and file_obj.file_size < 1024 * 1024:  # 1MB limit
+        truncated = False
+        if is_text:
+            # Only the leading snippet is rendered; the rest is streamed
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(file_path, "r", encoding="latin-1") as f:
-                        content = f.read()
-                except:
-                    is_text = False
+                with open(file_path, "rb") as f:
+                    content = f.read(PREVIEW_SNIPPET_SIZE).decode(
+                        "utf-8", errors="replace"
+                    )
+                truncated = file_stat.st_size > PREVIEW_SNIPPET_SIZE
+            except OSError:
+                is_text = False
 
         # Log activity
-        activity = Activity(
-            user_id=current_user.id,
-            file_id=file_obj.id,
-            action="preview",
-            details={"filename": file_obj.filename},
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get("User-Agent"),
-        )
-        db.session.add(activity)
-        db.session.commit()
+        queue_activity("preview", {"filename": file_obj.filename}, file_id=file_obj.id)
 
-        theme = request.cookies.get("theme", "tokyo-night")
         return render_template(
             "preview.html",
             file_obj=file_obj,
+            filename=filename,
             content=content,
+            truncated=truncated,
             is_text=is_text,
             is_image=is_image,
-            theme=theme,
+        )
+
+    @app.route("/preview/stream/<path:filename>")
+    @login_required
+    def preview_stream(filename):
+        """Stream full text content for previews larger than the snippet"""
+        file_obj = File.query.filter_by(
+            owner_id=current_user.id, file_path=filename
+        ).first()
+
+        file_path = safe_join(upload_root, filename)
+        if not file_obj or file_path is None or not os.path.isfile(file_path):
+            abort(404)
+
+        def generate():
+            with open(file_path, "rb") as f:
+                while chunk := f.read(PREVIEW_SNIPPET_SIZE):
+                    yield chunk
+
+        return Response(
+            stream_with_context(generate()), mimetype="text/plain; charset=utf-8"
         )
 
     # ===== ADMIN ROUTES =====
@@ -604,15 +744,26 @@ def create_app():
     @admin_required
     def admin_dashboard():
         """Admin dashboard with system analytics"""
-        # System statistics
-        total_users = User.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        total_files = File.query.count()
-        total_storage = db.session.query(db.func.sum(File.file_size)).scalar() or 0
+        # System statistics (one round trip for all four scalars)
+        total_users, active_users, total_files, total_storage = db.session.execute(
+            db.select(
+                db.select(db.func.count(User.id)).scalar_subquery(),
+                db.select(db.func.count(User.id))
+                .where(User.is_active.is_(True))
+                .scalar_subquery(),
+                db.select(db.func.count(File.id)).scalar_subquery(),
+                db.select(
+                    db.func.coalesce(db.func.sum(File.file_size), 0)
+                ).scalar_subquery(),
+            )
+        ).one()
 
-        # Recent activities
+        # Recent activities (users loaded in the same query for the template)
         recent_activities = (
-            Activity.query.order_by(desc(Activity.created_at)).limit(50).all()
+            Activity.query.options(joinedload(Activity.user))
+            .order_by(desc(Activity.created_at))
+            .limit(50)
+            .all()
         )
 
         # User statistics
@@ -620,14 +771,13 @@ def create_app():
             db.session.query(
                 User.username,
                 db.func.count(File.id).label("file_count"),
-                db.func.sum(File.file_size).label("total_size"),
+                db.func.coalesce(db.func.sum(File.file_size), 0).label("total_size"),
             )
             .outerjoin(File)
             .group_by(User.id, User.username)
             .all()
         )
 
-        theme = request.cookies.get("theme", "tokyo-night")
         return render_template(
             "admin_dashboard.html",
             total_users=total_users,
@@ -636,7 +786,6 @@ def create_app():
             total_storage=total_storage,
             recent_activities=recent_activities,
             user_stats=user_stats,
-            theme=theme,
         )
 
     return app
@@ -654,6 +803,7 @@ def init_system_settings():
         "enable_versioning": True,
         "enable_search": True,
         "retention_days": 365,
+        "session_cleanup_batch_size": 10000,
     }
 
     for key, value in defaults.items():
@@ -665,6 +815,360 @@ def init_system_settings():
     db.session.commit()
 
 
+def convert_uuid_columns():
+    """Convert VARCHAR(36) id columns to native uuid on PostgreSQL"""
+    if db.engine.dialect.name != "postgresql":
+        return
+
+    inspector = db.inspect(db.engine)
+    pending = []
+    for table in db.metadata.sorted_tables:
+        existing = {
+            column["name"]: column["type"]
+            for column in inspector.get_columns(table.name)
+        }
+        for column in table.columns:
+            if not isinstance(column.type.dialect_impl(db.engine.dialect), db.Uuid):
+                continue
+            if column.name in existing and not isinstance(
+                existing[column.name], db.Uuid
+            ):
+                pending.append((table.name, column.name))
+
+    if not pending:
+        return
+
+    tables = sorted({table for table, _ in pending})
+    with db.engine.begin() as connection:
+        # Foreign keys have to be dropped while both sides change type
+        foreign_keys = connection.execute(
+            db.text(
+                "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) "
+                "FROM pg_constraint WHERE contype = 'f' "
+                "AND (conrelid::regclass::text = ANY(:tables) "
+                "OR confrelid::regclass::text = ANY(:tables))"
+            ),
+            {"tables": tables},
+        ).all()
+        for table, name, _ in foreign_keys:
+            connection.execute(db.text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+        for table, column in pending:
+            connection.execute(
+                db.text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} "
+                    f"TYPE uuid USING {column}::uuid"
+                )
+            )
+        for table, name, definition in foreign_keys:
+            connection.execute(
+                db.text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+            )
+
+
+def backfill_mime_categories():
+    """Add the mime_category column if missing and fill it for old rows"""
+    columns = {column["name"] for column in db.inspect(db.engine).get_columns("files")}
+    if "mime_category" not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(
+                db.text("ALTER TABLE files ADD COLUMN mime_category VARCHAR(16)")
+            )
+            connection.execute(
+                db.text("CREATE INDEX ix_files_mime_category ON files (mime_category)")
+            )
+
+    prefix_cases = [
+        (File.mime_type.like(f"{prefix}%"), category)
+        for prefix, category in MIME_CATEGORY_PREFIXES.items()
+    ]
+    db.session.execute(
+        db.update(File)
+        .where(File.mime_category.is_(None))
+        .values(
+            mime_category=db.case(
+                *prefix_cases,
+                (
+                    or_(
+                        File.mime_type == "application/pdf",
+                        File.mime_type.like("%document%"),
+                    ),
+                    "document",
+                ),
+                else_="other",
+            )
+        )
+    )
+    db.session.commit()
+
+
+def create_missing_indexes():
+    """Create model indexes that are missing from existing tables"""
+    for table in db.metadata.sorted_tables:
+        for table_index in table.indexes:
+            try:
+                table_index.create(db.engine, checkfirst=True)
+            except Exception as e:
+                # e.g. a unique index over rows that already hold duplicates
+                print(f"Error creating index {table_index.name}: {e}")
+
+
+def backfill_daily_stats():
+    """Populate empty daily counter tables from existing users and files"""
+    for model, counter in ((User, DailyUserStats), (File, DailyFileStats)):
+        if db.session.query(counter.date).first() is not None:
+            continue
+
+        day = db.func.date(model.created_at)
+        rows = (
+            db.session.query(day, db.func.count(model.id))
+            .filter(model.created_at.isnot(None))
+            .group_by(day)
+            .all()
+        )
+        # SQLite's date() returns ISO strings
+        db.session.add_all(
+            counter(
+                date=value if isinstance(value, date) else date.fromisoformat(value),
+                count=count,
+            )
+            for value, count in rows
+        )
+
+    db.session.commit()
+
+
+@lru_cache(maxsize=1024)
+def guess_mime_type_for_extension(extension):
+    """Cached MIME type lookup keyed by lowercased extension"""
+    mime_type, _ = mimetypes.guess_type(f"file{extension}")
+    return mime_type
+
+
+def guess_mime_type(path):
+    """Guess a file's MIME type from its extension, then from its contents"""
+    extension = os.path.splitext(path)[1].lower()
+    return guess_mime_type_for_extension(extension) or sniff_mime(path)
+
+
+class LoginRateLimiter:
+    """Per-IP sliding-window limit on failed login attempts"""
+
+    def __init__(self, limit, window=60):
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.last_sweep = time.monotonic()
+
+    def _prune(self, ip, now):
+        attempts = self.attempts.get(ip)
+        if attempts is None:
+            return None
+        while attempts and now - attempts[0] > self.window:
+            attempts.popleft()
+        if not attempts:
+            # Forget clients with nothing left in the window
+            del self.attempts[ip]
+            return None
+        return attempts
+
+    def allow(self, ip):
+        """Whether ip may try to log in now"""
+        with self.lock:
+            attempts = self._prune(ip, time.monotonic())
+            return attempts is None or len(attempts) < self.limit
+
+    def record_failure(self, ip):
+        """Count one failed login for ip"""
+        now = time.monotonic()
+        with self.lock:
+            self.attempts.setdefault(ip, deque()).append(now)
+            # Drop expired clients that never came back, once per window
+            if now - self.last_sweep > self.window:
+                for stale_ip in list(self.attempts):
+                    self._prune(stale_ip, now)
+                self.last_sweep = now
+
+
+class OrjsonModule:
+    """json-compatible module shim that encodes Socket.IO packets with orjson"""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC).decode()
+
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        return orjson.loads(data)
+
+
+class UploadEventBuffer:
+    """Thread-safe per-room buffer of pending upload events"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.has_pending = threading.Event()
+
+    def add(self, room, event):
+        with self.lock:
+            self.pending.setdefault(room, []).append(event)
+        self.has_pending.set()
+
+    def drain(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.has_pending.clear()
+        return pending
+
+
+class HashingReader:
+    """File-like wrapper that hashes and counts bytes as they are read"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.hash.update(data)
+        self.size += len(data)
+        return data
+
+
+def load_secret_key(instance_path):
+    """Read the session key from the environment or a persisted key file"""
+    secret = os.getenv("UPLOADSERVER_SECRET")
+    if secret:
+        return secret
+
+    key_path = os.path.join(instance_path, "secret.key")
+    try:
+        os.makedirs(instance_path, exist_ok=True)
+        if not os.path.exists(key_path):
+            # First boot: write the key to a temp file, then link it into
+            # place so other workers never see a partial file; if another
+            # worker linked first, theirs wins
+            fd, tmp_path = tempfile.mkstemp(dir=instance_path)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(os.urandom(24))
+                try:
+                    os.link(tmp_path, key_path)
+                except FileExistsError:
+                    pass
+            finally:
+                os.unlink(tmp_path)
+
+        with open(key_path, "rb") as f:
+            key = f.read()
+        if key:
+            return key
+        print(f"Error: secret key file {key_path} is empty; delete it to regenerate")
+    except OSError as e:
+        print(f"Error persisting secret key in {instance_path}: {e}")
+
+    print(
+        "Warning: using a per-process secret key; set UPLOADSERVER_SECRET so "
+        "sessions survive restarts and are shared between workers"
+    )
+    return os.urandom(24)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL journaling and larger caches for every new SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
+    cursor.execute("PRAGMA cache_size=-65536")  # 64MB
+    cursor.close()
+
+
+def build_search_index(app, directory, reindex=False):
+    """Index the upload directory, letting only one worker process do the work
+
+    Returns True when the index was built here or by another worker, False
+    when this pass failed.
+    """
+    lock_path = os.path.join(SEARCH_ENGINE.index_dir, "build.lock")
+    # Written by the worker that holds the lock once its build succeeded
+    stamp_path = os.path.join(SEARCH_ENGINE.index_dir, "build.ok")
+    with open(lock_path, "w") as lock:
+        if fcntl:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # Another worker is indexing; wait for it to finish
+                fcntl.flock(lock, fcntl.LOCK_SH)
+                if os.path.exists(stamp_path):
+                    SEARCH_ENGINE.index_ready.set()
+                    return True
+                # Its build failed; take over and try here
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+        try:
+            os.remove(stamp_path)
+        except FileNotFoundError:
+            pass
+
+        with app.app_context():
+            # Retry with backoff, e.g. when the file monitor holds the writer
+            for delay in (0,) + INDEX_RETRY_DELAYS:
+                if delay:
+                    print(f"Search index build failed; retrying in {delay}s")
+                    time.sleep(delay)
+                if reindex:
+                    # Full parallel rebuild of every file's document
+                    built = SEARCH_ENGINE.bulk_reindex(directory)
+                else:
+                    built = SEARCH_ENGINE.index_directory(directory)
+                if built:
+                    open(stamp_path, "w").close()
+                    return True
+            return False
+
+
+def record_download_analytics(app, analytics_queue, interval=0.1):
+    """Batch queued downloads into one UPDATE and one activity INSERT"""
+    files = File.__table__
+
+    while True:
+        batch = [analytics_queue.get()]
+        time.sleep(interval)
+        while True:
+            try:
+                batch.append(analytics_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        counts = Counter(entry["file_id"] for entry in batch)
+        now = datetime.now(timezone.utc)
+
+        with app.app_context():
+            try:
+                db.session.execute(
+                    db.update(files)
+                    .where(files.c.id == db.bindparam("target_id"))
+                    .values(
+                        download_count=files.c.download_count
+                        + db.bindparam("increment"),
+                        last_accessed=now,
+                    ),
+                    [
+                        {"target_id": file_id, "increment": increment}
+                        for file_id, increment in counts.items()
+                    ],
+                )
+                db.session.execute(db.insert(Activity), batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error recording download analytics: {e}")
+
+
 def is_shared_directory(path):
     """Check if directory contains shared files"""
     # This would be implemented based on your sharing logic
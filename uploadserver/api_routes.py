@@ -2,15 +2,70 @@
 Advanced API endpoints for UploadServer Pro
 """
 
-from flask import jsonify, request, abort
+from flask import Response, jsonify, request, abort, url_for, has_request_context
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from flask_login import login_required, current_user
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+import base64
+import math
+import queue
+import threading
+import time
 import uuid
 import os
 
-from .models import db, File, Share, Activity, User
+from cachetools import TTLCache
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from .models import (
+    db,
+    File,
+    FileVersion,
+    Share,
+    Activity,
+    Comment,
+    User,
+    DailyUserStats,
+    DailyFileStats,
+)
 from .search_engine import SEARCH_ENGINE
 
+# Per-user storage breakdown, dropped whenever the user's files change
+STORAGE_CACHE = TTLCache(maxsize=10000, ttl=60)
+STORAGE_CACHE_LOCK = threading.Lock()
+
+# Columns returned by file listings; full rows come from /api/files/<id>
+FILE_LIST_COLUMNS = (
+    File.id,
+    File.filename,
+    File.original_filename,
+    File.file_size,
+    File.mime_type,
+    File.mime_category,
+    File.parent_directory,
+    File.is_public,
+    File.tags,
+    File.created_at,
+)
+
+# Activity rows written in bulk by a background thread
+ACTIVITY_QUEUE = queue.Queue()
+
+# Search index maintenance off the request thread; a single worker keeps
+# writes for the same file in submission order (lock contention with other
+# writers is handled by SearchEngine.bulk_writer)
+INDEX_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
 
 def api_required(f):
     """Decorator to require API authentication"""
@@ -18,14 +73,181 @@ def api_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated:
-            return jsonify({"error": "Authentication required"}), 401
+            return ojson({"error": "Authentication required"}), 401
         return f(*args, **kwargs)
 
     return decorated_function
 
 
+def file_summary(row):
+    """Listing dict built from a FILE_LIST_COLUMNS row"""
+    return {
+        "id": row.id,
+        "filename": row.filename,
+        "original_filename": row.original_filename,
+        "file_size": row.file_size,
+        "mime_type": row.mime_type,
+        "mime_category": row.mime_category,
+        "parent_directory": row.parent_directory,
+        "is_public": row.is_public,
+        "tags": row.tags,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def ojson(payload):
+    """JSON response encoded with orjson, falling back to jsonify"""
+    if not ORJSON_AVAILABLE:
+        return jsonify(payload)
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS),
+        mimetype="application/json",
+    )
+
+
+def invalidate_storage_info(user_id):
+    """Forget the cached storage breakdown for a user"""
+    with STORAGE_CACHE_LOCK:
+        STORAGE_CACHE.pop(user_id, None)
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor for a row ordered by (created_at, id)"""
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, or None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, row_id = raw.split("|", 1)
+        # Ids are UUIDs; reject anything else before it reaches a uuid column
+        return datetime.fromisoformat(created_at), str(uuid.UUID(row_id))
+    except ValueError:
+        return None
+
+
+def keyset_page(query, model, position, per_page):
+    """Fetch one newest-first page after position; returns (rows, next_cursor)"""
+    if position:
+        created_at, row_id = position
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < row_id),
+            )
+        )
+
+    rows = (
+        query.order_by(model.created_at.desc(), model.id.desc())
+        .limit(per_page + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(rows[per_page - 1]) if len(rows) > per_page else None
+    return rows[:per_page], next_cursor
+
+
+def queue_activity(action, details, file_id=None, user_id=None):
+    """Hand an activity row to the background writer"""
+    ACTIVITY_QUEUE.put_nowait(
+        {
+            "user_id": user_id or current_user.id,
+            "file_id": file_id,
+            "action": action,
+            "details": details,
+            "ip_address": request.remote_addr if has_request_context() else None,
+            "user_agent": (
+                request.headers.get("User-Agent") if has_request_context() else None
+            ),
+        }
+    )
+
+
+def record_activities(app, activity_queue, write_lock, max_batch=256, interval=0.1):
+    """Bulk insert queued activities every interval or max_batch rows"""
+    while True:
+        batch = [activity_queue.get()]
+        deadline = time.monotonic() + interval
+        while len(batch) < max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(activity_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        with app.app_context(), write_lock:
+            try:
+                db.session.execute(db.insert(Activity), batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error writing activity log: {e}")
+
+
+def reindex_file(app, file_id):
+    """Refresh a file's search document from a fresh database read"""
+    with app.app_context():
+        file_obj = db.session.get(File, file_id, options=[joinedload(File.owner)])
+        if file_obj:
+            SEARCH_ENGINE.update_file(file_obj)
+
+
+def unindex_file(file_id, owner_id):
+    """Drop a file's search document and the owner's cached results"""
+    SEARCH_ENGINE.delete_file(file_id)
+    SEARCH_ENGINE.invalidate_cache(owner_id)
+
+
+def unindex_files(file_ids, owner_id):
+    """Drop several files' search documents with one index writer"""
+    SEARCH_ENGINE.bulk_update(None, [], deleted_ids=file_ids)
+    SEARCH_ENGINE.invalidate_cache(owner_id)
+
+
+def remove_file(path):
+    """Remove a file if present, returning the error instead of raising"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        return e
+    return None
+
+
+def get_write_lock(app):
+    """Return the app's in-process database write lock"""
+    # SQLite allows a single writer; serialize in-process writes rather than
+    # letting them retry on "database is locked"
+    if "write_lock" not in app.extensions:
+        app.extensions["write_lock"] = (
+            threading.Lock()
+            if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite")
+            else nullcontext()
+        )
+    return app.extensions["write_lock"]
+
+
+def start_activity_writer(app):
+    """Start the background activity writer once per app"""
+    if "activity_writer" in app.extensions:
+        return
+    writer = threading.Thread(
+        target=record_activities,
+        args=(app, ACTIVITY_QUEUE, get_write_lock(app)),
+        daemon=True,
+    )
+    app.extensions["activity_writer"] = writer
+    writer.start()
+
+
 def register_api_routes(app):
     """Register all API routes"""
+    write_lock = get_write_lock(app)
+    start_activity_writer(app)
 
     # ===== FILE MANAGEMENT API =====
 
@@ -38,29 +260,90 @@ def register_api_routes(app):
         search = request.args.get("search", "")
         file_type = request.args.get("type", "")  # image, document, video, etc.
 
-        query = File.query.filter_by(owner_id=current_user.id)
+        if search and not SEARCH_ENGINE.index_ready.is_set():
+            return ojson({"error": "Search index is warming up"}), 503
+
+        if search and not file_type:
+            # Keep the engine's ranking and load only the requested page
+            search_results = SEARCH_ENGINE.cached_search(
+                search,
+                user_id=current_user.id,
+                limit=per_page,
+                offset=(page - 1) * per_page,
+            )
+            page_ids = [r["id"] for r in search_results["results"]]
+            by_id = {
+                row.id: row
+                for row in db.session.query(*FILE_LIST_COLUMNS)
+                .filter(File.owner_id == current_user.id, File.id.in_(page_ids))
+                .all()
+            }
+            total = search_results["total"]
+            pages = math.ceil(total / per_page) if per_page > 0 else 0
+
+            return ojson(
+                {
+                    "files": [file_summary(by_id[i]) for i in page_ids if i in by_id],
+                    "pagination": {
+                        "page": page,
+                        "per_page": per_page,
+                        "total": total,
+                        "pages": pages,
+                        "has_next": page < pages,
+                        "has_prev": page > 1,
+                    },
+                }
+            )
+
+        # Plain column rows skip ORM hydration for listing pages
+        query = db.session.query(*FILE_LIST_COLUMNS).filter(
+            File.owner_id == current_user.id
+        )
 
         # Apply search filter
         if search:
-            search_results = SEARCH_ENGINE.search(search, user_id=current_user.id)
+            search_results = SEARCH_ENGINE.cached_search(
+                search, user_id=current_user.id
+            )
             file_ids = [r["id"] for r in search_results["results"]]
             query = query.filter(File.id.in_(file_ids))
 
-        # Apply type filter
+        # Apply type filter (indexed equality on the stored category)
         if file_type:
-            if file_type == "image":
-                query = query.filter(File.mime_type.like("image/%"))
-            elif file_type == "document":
-                query = query.filter(File.mime_type.like("%document%"))
-            elif file_type == "video":
-                query = query.filter(File.mime_type.like("video/%"))
+            query = query.filter(File.mime_category == file_type)
+
+        if not search and "cursor" in request.args:
+            # Keyset pagination (opt in with ?cursor=, empty for the first
+            # page): no OFFSET scan and no COUNT query
+            position = None
+            cursor = request.args.get("cursor")
+            if cursor:
+                position = decode_cursor(cursor)
+                if position is None:
+                    return ojson({"error": "Invalid cursor"}), 400
+
+            per_page = max(per_page, 1)
+            files, next_cursor = keyset_page(query, File, position, per_page)
+
+            return ojson(
+                {
+                    "files": [file_summary(row) for row in files],
+                    "pagination": {
+                        "per_page": per_page,
+                        "next_cursor": next_cursor,
+                        "has_next": next_cursor is not None,
+                    },
+                }
+            )
 
-        # Apply pagination
-        files = query.paginate(page=page, per_page=per_page, error_out=False)
+        # Apply pagination, in the same newest-first order as the cursor pages
+        files = query.order_by(File.created_at.desc(), File.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
 
-        return jsonify(
+        return ojson(
             {
-                "files": [file.to_dict() for file in files.items],
+                "files": [file_summary(row) for row in files.items],
                 "pagination": {
                     "page": files.page,
                     "per_page": files.per_page,
@@ -79,9 +362,9 @@ def register_api_routes(app):
         file_obj = File.query.filter_by(id=file_id, owner_id=current_user.id).first()
 
         if not file_obj:
-            return jsonify({"error": "File not found"}), 404
+            return ojson({"error": "File not found"}), 404
 
-        return jsonify(file_obj.to_dict())
+        return ojson(file_obj.to_dict())
 
     @app.route("/api/files/<file_id>", methods=["PUT"])
     @api_required
@@ -90,7 +373,7 @@ def register_api_routes(app):
         file_obj = File.query.filter_by(id=file_id, owner_id=current_user.id).first()
 
         if not file_obj:
-            return jsonify({"error": "File not found"}), 404
+            return ojson({"error": "File not found"}), 404
 
         data = request.get_json()
 
@@ -106,22 +389,18 @@ def register_api_routes(app):
             file_obj.is_public = data["is_public"]
 
         file_obj.updated_at = datetime.now(timezone.utc)
-        db.session.commit()
+        with write_lock:
+            db.session.commit()
 
         # Log activity
-        activity = Activity(
-            user_id=current_user.id,
-            file_id=file_id,
-            action="update_metadata",
-            details={"updated_fields": list(data.keys())},
+        queue_activity(
+            "update_metadata", {"updated_fields": list(data.keys())}, file_id=file_id
         )
-        db.session.add(activity)
-        db.session.commit()
 
-        # Update search index
-        SEARCH_ENGINE.update_file(file_obj)
+        # Update search index in the background
+        INDEX_EXECUTOR.submit(reindex_file, app, file_obj.id)
 
-        return jsonify(file_obj.to_dict())
+        return ojson(file_obj.to_dict())
 
     @app.route("/api/files/<file_id>", methods=["DELETE"])
     @api_required
@@ -130,7 +409,7 @@ def register_api_routes(app):
         file_obj = File.query.filter_by(id=file_id, owner_id=current_user.id).first()
 
         if not file_obj:
-            return jsonify({"error": "File not found"}), 404
+            return ojson({"error": "File not found"}), 404
 
         try:
             # Delete physical file
@@ -138,28 +417,28 @@ def register_api_routes(app):
             if os.path.exists(file_path):
                 os.remove(file_path)
 
-            # Delete from database
+            # Delete from database and release the quota in the same commit
             db.session.delete(file_obj)
-            db.session.commit()
+            with write_lock:
+                User.query.filter_by(id=current_user.id).update(
+                    {"storage_used": User.storage_used - (file_obj.file_size or 0)}
+                )
+                db.session.commit()
 
-            # Log activity
-            activity = Activity(
-                user_id=current_user.id,
-                file_id=file_id,
-                action="delete",
-                details={"filename": file_obj.filename},
+            # Log activity; it cannot reference the deleted row
+            queue_activity(
+                "delete", {"file_id": file_id, "filename": file_obj.filename}
             )
-            db.session.add(activity)
-            db.session.commit()
 
-            # Remove from search index
-            SEARCH_ENGINE.delete_file(file_id)
+            # Remove from search index in the background
+            INDEX_EXECUTOR.submit(unindex_file, file_id, current_user.id)
+            invalidate_storage_info(current_user.id)
 
-            return jsonify({"message": "File deleted successfully"})
+            return ojson({"message": "File deleted successfully"})
 
         except Exception as e:
             db.session.rollback()
-            return jsonify({"error": f"Error deleting file: {str(e)}"}), 500
+            return ojson({"error": f"Error deleting file: {str(e)}"}), 500
 
     @app.route("/api/files/batch", methods=["POST"])
     @api_required
@@ -170,10 +449,24 @@ def register_api_routes(app):
         file_ids = data.get("file_ids", [])
         results = []
 
+        # Fetch every requested file in one query
+        by_id = {
+            file_obj.id: file_obj
+            for file_obj in File.query.filter(
+                File.owner_id == current_user.id, File.id.in_(file_ids)
+            ).all()
+        }
+        to_delete = []
+
+        tags = data.get("tags", [])
+        if operation == "add_tags" and not (
+            isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)
+        ):
+            return ojson({"error": "tags must be a list of strings"}), 400
+        new_tags = frozenset(tags) if operation == "add_tags" else None
+
         for file_id in file_ids:
-            file_obj = File.query.filter_by(
-                id=file_id, owner_id=current_user.id
-            ).first()
+            file_obj = by_id.get(file_id)
 
             if not file_obj:
                 results.append(
@@ -183,24 +476,22 @@ def register_api_routes(app):
 
             try:
                 if operation == "delete":
-                    # Delete file
-                    file_path = os.path.join(
-                        app.config["UPLOAD_FOLDER"], file_obj.file_path
-                    )
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-
-                    db.session.delete(file_obj)
-                    results.append(
-                        {"file_id": file_id, "status": "success", "message": "Deleted"}
-                    )
+                    # Removed from disk and database together after the loop
+                    result = {
+                        "file_id": file_id,
+                        "status": "success",
+                        "message": "Deleted",
+                    }
+                    to_delete.append((file_obj, result))
+                    results.append(result)
 
                 elif operation == "add_tags":
                     # Add tags
-                    tags = data.get("tags", [])
-                    if isinstance(tags, list):
+                    if new_tags is not None:
                         existing_tags = file_obj.tags or []
-                        file_obj.tags = list(set(existing_tags + tags))
+                        # Only dirty the row when a tag is actually new
+                        if not new_tags.issubset(existing_tags):
+                            file_obj.tags = list(new_tags.union(existing_tags))
                         results.append(
                             {
                                 "file_id": file_id,
@@ -226,22 +517,64 @@ def register_api_routes(app):
                     {"file_id": file_id, "status": "error", "message": str(e)}
                 )
 
-        db.session.commit()
+        # Database first: if the commit fails nothing has been unlinked yet
+        deleted_ids = [file_obj.id for file_obj, _ in to_delete]
+        freed = sum(file_obj.file_size or 0 for file_obj, _ in to_delete)
+
+        try:
+            with write_lock:
+                if deleted_ids:
+                    # Bulk DELETE skips ORM cascades, so clear dependent rows
+                    for model in (FileVersion, Share, Activity, Comment):
+                        model.query.filter(model.file_id.in_(deleted_ids)).delete(
+                            synchronize_session=False
+                        )
+                    File.query.filter(File.id.in_(deleted_ids)).delete(
+                        synchronize_session=False
+                    )
+                    User.query.filter_by(id=current_user.id).update(
+                        {"storage_used": User.storage_used - freed},
+                        synchronize_session=False,
+                    )
+
+                # Single commit for every mutation in the batch
+                db.session.commit()
+        except Exception as e:
+            # Nothing from the batch is left half-applied in the database
+            db.session.rollback()
+            return ojson({"error": f"Error applying batch: {str(e)}"}), 500
+
+        if to_delete:
+            # Overlap the unlink syscalls; os.remove releases the GIL
+            paths = [
+                os.path.join(app.config["UPLOAD_FOLDER"], file_obj.file_path)
+                for file_obj, _ in to_delete
+            ]
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                errors = list(executor.map(remove_file, paths))
+
+            for path, (_, result), error in zip(paths, to_delete, errors):
+                if error:
+                    # The record is gone; only the bytes on disk are left over
+                    print(f"Error removing deleted file {path}: {error}")
+                    result["warning"] = f"File could not be removed from disk: {error}"
+
+            # Drop the deleted files from the search index in the background
+            INDEX_EXECUTOR.submit(unindex_files, deleted_ids, current_user.id)
 
         # Log batch activity
-        activity = Activity(
-            user_id=current_user.id,
-            action=f"batch_{operation}",
-            details={
+        queue_activity(
+            f"batch_{operation}",
+            {
                 "operation": operation,
                 "file_count": len(file_ids),
                 "results": results,
             },
         )
-        db.session.add(activity)
-        db.session.commit()
+        SEARCH_ENGINE.invalidate_cache(current_user.id)
+        invalidate_storage_info(current_user.id)
 
-        return jsonify(
+        return ojson(
             {
                 "operation": operation,
                 "results": results,
@@ -259,6 +592,9 @@ def register_api_routes(app):
     @api_required
     def api_search():
         """Advanced search with filters"""
+        if not SEARCH_ENGINE.index_ready.is_set():
+            return ojson({"error": "Search index is warming up"}), 503
+
         query = request.args.get("q", "")
         filters = {
             "mime_type": request.args.get("type"),
@@ -272,11 +608,11 @@ def register_api_routes(app):
         # Remove None values
         filters = {k: v for k, v in filters.items() if v is not None}
 
-        results = SEARCH_ENGINE.search(
+        results = SEARCH_ENGINE.cached_search(
             query_string=query, user_id=current_user.id, filters=filters, limit=50
         )
 
-        return jsonify(results)
+        return ojson(results)
 
     @app.route("/api/search/suggestions", methods=["GET"])
     @api_required
@@ -287,7 +623,7 @@ def register_api_routes(app):
 
         suggestions = SEARCH_ENGINE.get_suggestions(query, field=field, limit=10)
 
-        return jsonify({"query": query, "suggestions": suggestions})
+        return ojson({"query": query, "suggestions": suggestions})
 
     # ===== SHARING API =====
 
@@ -308,61 +644,69 @@ def register_api_routes(app):
         file_obj = File.query.filter_by(id=file_id, owner_id=current_user.id).first()
 
         if not file_obj:
-            return jsonify({"error": "File not found"}), 404
+            return ojson({"error": "File not found"}), 404
 
-        # Check existing shares
-        existing_share = Share.query.filter_by(
-            file_id=file_id, creator_id=current_user.id, is_active=True
-        ).first()
-
-        if existing_share:
-            return jsonify(existing_share.to_dict())
-
-        # Create new share
-        share = Share(
-            file_id=file_id,
-            creator_id=current_user.id,
-            share_token=str(uuid.uuid4()),
-            share_type=share_type,
-            permissions=permissions,
-            password_protected=password_protected,
-            share_password=share_password if password_protected else None,
-            expires_at=datetime.fromisoformat(expires_at) if expires_at else None,
-            download_limit=download_limit,
-        )
+        # Create new share; the unique active-share index rejects duplicates.
+        # A conflict that leaves no active share behind (a share_token
+        # collision, or the share was deactivated meanwhile) is retried once.
+        for _ in range(2):
+            share = Share(
+                file_id=file_id,
+                creator_id=current_user.id,
+                share_token=str(uuid.uuid4()),
+                share_type=share_type,
+                permissions=permissions,
+                password_protected=password_protected,
+                share_password=share_password if password_protected else None,
+                expires_at=datetime.fromisoformat(expires_at) if expires_at else None,
+                download_limit=download_limit,
+            )
 
-        db.session.add(share)
-        db.session.commit()
+            db.session.add(share)
+            try:
+                with write_lock:
+                    db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                existing_share = Share.query.filter_by(
+                    file_id=file_id, creator_id=current_user.id, is_active=True
+                ).first()
+                if existing_share:
+                    return ojson(existing_share.to_dict())
+        else:
+            return ojson({"error": "Share could not be created, please retry"}), 409
 
         # Log activity
-        activity = Activity(
-            user_id=current_user.id,
+        queue_activity(
+            "share",
+            {"share_type": share_type, "permissions": permissions},
             file_id=file_id,
-            action="share",
-            details={"share_type": share_type, "permissions": permissions},
         )
-        db.session.add(activity)
-        db.session.commit()
 
-        return jsonify(share.to_dict())
+        return ojson(share.to_dict())
 
     @app.route("/api/shares/<share_token>", methods=["GET"])
     def api_get_share(share_token):
         """Get share details (public endpoint)"""
-        share = Share.query.filter_by(share_token=share_token, is_active=True).first()
+        share = (
+            Share.query.options(joinedload(Share.file))
+            .filter_by(share_token=share_token, is_active=True)
+            .first()
+        )
 
         if not share:
-            return jsonify({"error": "Share not found or expired"}), 404
+            return ojson({"error": "Share not found or expired"}), 404
 
         # Check expiration
         if share.expires_at and share.expires_at < datetime.now(timezone.utc):
-            return jsonify({"error": "Share has expired"}), 410
+            return ojson({"error": "Share has expired"}), 410
 
         # Check download limit
         if share.download_limit and share.download_count >= share.download_limit:
-            return jsonify({"error": "Download limit exceeded"}), 410
+            return ojson({"error": "Download limit exceeded"}), 410
 
-        return jsonify(
+        return ojson(
             {
                 "file": share.file.to_dict(),
                 "share": share.to_dict(),
@@ -373,10 +717,14 @@ def register_api_routes(app):
     @app.route("/api/shares/<share_token>/download", methods=["POST"])
     def api_download_shared_file(share_token):
         """Download shared file"""
-        share = Share.query.filter_by(share_token=share_token, is_active=True).first()
+        share = (
+            Share.query.options(joinedload(Share.file))
+            .filter_by(share_token=share_token, is_active=True)
+            .first()
+        )
 
         if not share:
-            return jsonify({"error": "Share not found or expired"}), 404
+            return ojson({"error": "Share not found or expired"}), 404
 
         # Password protection
         if share.password_protected:
@@ -384,14 +732,20 @@ def register_api_routes(app):
             password = data.get("password", "")
 
             if not share.check_password(password):
-                return jsonify({"error": "Invalid password"}), 401
-
-        # Update download count
-        share.download_count += 1
-        share.last_accessed = datetime.now(timezone.utc)
-        db.session.commit()
+                return ojson({"error": "Invalid password"}), 401
+
+        # Update download count with a server-side increment
+        with write_lock:
+            Share.query.filter_by(id=share.id).update(
+                {
+                    Share.download_count: Share.download_count + 1,
+                    Share.last_accessed: datetime.now(timezone.utc),
+                },
+                synchronize_session=False,
+            )
+            db.session.commit()
 
-        return jsonify(
+        return ojson(
             {
                 "download_url": url_for("download_file", filename=share.file.file_path),
                 "file": share.file.to_dict(),
@@ -404,7 +758,7 @@ def register_api_routes(app):
     @api_required
     def api_get_profile():
         """Get current user profile"""
-        return jsonify(current_user.to_dict())
+        return ojson(current_user.to_dict())
 
     @app.route("/api/user/profile", methods=["PUT"])
     @api_required
@@ -420,35 +774,29 @@ def register_api_routes(app):
             current_user.avatar_url = data["avatar_url"]
 
         if "email" in data:
-            # Check if email is already taken by another user
-            existing_user = User.query.filter(
-                User.email == data["email"], User.id != current_user.id
-            ).first()
-
-            if existing_user:
-                return jsonify({"error": "Email already taken"}), 400
-
             current_user.email = data["email"]
 
         current_user.updated_at = datetime.now(timezone.utc)
-        db.session.commit()
+        try:
+            with write_lock:
+                db.session.commit()
+        except IntegrityError:
+            # users.email is unique; a clash means another user owns it
+            db.session.rollback()
+            return ojson({"error": "Email already taken"}), 400
 
-        return jsonify(current_user.to_dict())
+        return ojson(current_user.to_dict())
 
     @app.route("/api/user/storage", methods=["GET"])
     @api_required
     def api_get_storage_info():
         """Get user storage information"""
-        total_size = (
-            db.session.query(db.func.sum(File.file_size))
-            .filter_by(owner_id=current_user.id)
-            .scalar()
-            or 0
-        )
+        with STORAGE_CACHE_LOCK:
+            storage_info = STORAGE_CACHE.get(current_user.id)
+        if storage_info is not None:
+            return ojson(storage_info)
 
-        file_count = File.query.filter_by(owner_id=current_user.id).count()
-
-        # Storage breakdown by type
+        # Storage breakdown by type; totals are summed from it in Python
         storage_by_type = (
             db.session.query(
                 File.mime_type,
@@ -459,25 +807,29 @@ def register_api_routes(app):
             .group_by(File.mime_type)
             .all()
         )
+        total_size = sum(row.total_size or 0 for row in storage_by_type)
+        file_count = sum(row.count for row in storage_by_type)
+
+        storage_info = {
+            "total_size": total_size,
+            "file_count": file_count,
+            "quota": current_user.storage_quota,
+            "usage_percent": (total_size / current_user.storage_quota * 100)
+            if current_user.storage_quota > 0
+            else 0,
+            "storage_by_type": [
+                {
+                    "type": row.mime_type or "unknown",
+                    "size": row.total_size,
+                    "count": row.count,
+                }
+                for row in storage_by_type
+            ],
+        }
+        with STORAGE_CACHE_LOCK:
+            STORAGE_CACHE[current_user.id] = storage_info
 
-        return jsonify(
-            {
-                "total_size": total_size,
-                "file_count": file_count,
-                "quota": current_user.storage_quota,
-                "usage_percent": (total_size / current_user.storage_quota * 100)
-                if current_user.storage_quota > 0
-                else 0,
-                "storage_by_type": [
-                    {
-                        "type": row.mime_type or "unknown",
-                        "size": row.total_size,
-                        "count": row.count,
-                    }
-                    for row in storage_by_type
-                ],
-            }
-        )
+        return ojson(storage_info)
 
     # ===== ACTIVITY API =====
 
@@ -485,29 +837,31 @@ def register_api_routes(app):
     @api_required
     def api_get_activities():
         """Get user activities"""
-        page = request.args.get("page", 1, type=int)
-        per_page = request.args.get("per_page", 20, type=int)
+        per_page = max(request.args.get("per_page", 20, type=int), 1)
         action = request.args.get("action", "")
 
+        position = None
+        cursor = request.args.get("cursor")
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                return ojson({"error": "Invalid cursor"}), 400
+
         query = Activity.query.filter_by(user_id=current_user.id)
 
         if action:
             query = query.filter_by(action=action)
 
-        activities = query.order_by(Activity.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Keyset pagination: no OFFSET scan and no COUNT query
+        activities, next_cursor = keyset_page(query, Activity, position, per_page)
 
-        return jsonify(
+        return ojson(
             {
-                "activities": [activity.to_dict() for activity in activities.items],
+                "activities": [activity.to_dict() for activity in activities],
                 "pagination": {
-                    "page": activities.page,
-                    "per_page": activities.per_page,
-                    "total": activities.total,
-                    "pages": activities.pages,
-                    "has_next": activities.has_next,
-                    "has_prev": activities.has_prev,
+                    "per_page": per_page,
+                    "next_cursor": next_cursor,
+                    "has_next": next_cursor is not None,
                 },
             }
         )
@@ -519,37 +873,47 @@ def register_api_routes(app):
     def api_get_system_stats():
         """Get system statistics (admin only)"""
         if current_user.role != "admin":
-            return jsonify({"error": "Admin access required"}), 403
-
-        total_users = User.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        total_files = File.query.count()
-        public_files = File.query.filter_by(is_public=True).count()
-        total_storage = db.session.query(db.func.sum(File.file_size)).scalar() or 0
+            return ojson({"error": "Admin access required"}), 403
+
+        # All five scalars in one round trip
+        (
+            total_users,
+            active_users,
+            total_files,
+            public_files,
+            total_storage,
+        ) = db.session.execute(
+            db.select(
+                db.select(db.func.count(User.id)).scalar_subquery(),
+                db.select(db.func.count(User.id))
+                .where(User.is_active.is_(True))
+                .scalar_subquery(),
+                db.select(db.func.count(File.id)).scalar_subquery(),
+                db.select(db.func.count(File.id))
+                .where(File.is_public.is_(True))
+                .scalar_subquery(),
+                db.select(
+                    db.func.coalesce(db.func.sum(File.file_size), 0)
+                ).scalar_subquery(),
+            )
+        ).one()
 
         # User registration over time
+        since = (datetime.now(timezone.utc) - timedelta(days=30)).date()
         recent_registrations = (
-            db.session.query(
-                db.func.date(User.created_at).label("date"),
-                db.func.count(User.id).label("count"),
-            )
-            .filter(User.created_at >= datetime.now(timezone.utc) - timedelta(days=30))
-            .group_by(db.func.date(User.created_at))
+            DailyUserStats.query.filter(DailyUserStats.date >= since)
+            .order_by(DailyUserStats.date)
             .all()
         )
 
         # File uploads over time
         recent_uploads = (
-            db.session.query(
-                db.func.date(File.created_at).label("date"),
-                db.func.count(File.id).label("count"),
-            )
-            .filter(File.created_at >= datetime.now(timezone.utc) - timedelta(days=30))
-            .group_by(db.func.date(File.created_at))
+            DailyFileStats.query.filter(DailyFileStats.date >= since)
+            .order_by(DailyFileStats.date)
             .all()
         )
 
-        return jsonify(
+        return ojson(
             {
                 "users": {
                     "total": total_users,
@@ -5,8 +5,12 @@ Database models for UploadServer Pro
 from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from sqlalchemy.dialects.postgresql import UUID
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID, insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
 from cryptography.fernet import Fernet
 import uuid
 import json
@@ -14,11 +18,34 @@ import os
 
 db = SQLAlchemy()
 
+# Argon2id at the OWASP baseline (19 MiB, t=2, p=1); hashes made with other
+# parameters are rehashed on the next successful login
+PASSWORD_HASHER = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
+# Ids are native 16-byte uuid columns on PostgreSQL and VARCHAR(36) elsewhere;
+# as_uuid=False keeps them plain strings in Python on every backend
+UUID_TYPE = db.String(36).with_variant(UUID(as_uuid=False), "postgresql")
+
+# Coarse file categories used by the file type filter
+MIME_CATEGORY_PREFIXES = {"image/": "image", "video/": "video", "audio/": "audio"}
+
+
+def mime_category_for(mime_type):
+    """Map a MIME type to its filterable category"""
+    if not mime_type:
+        return "other"
+    for prefix, category in MIME_CATEGORY_PREFIXES.items():
+        if mime_type.startswith(prefix):
+            return category
+    if mime_type == "application/pdf" or "document" in mime_type:
+        return "document"
+    return "other"
+
 
 class User(UserMixin, db.Model):
     __tablename__ = "users"
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID_TYPE, primary_key=True, default=lambda: str(uuid.uuid4()))
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
@@ -53,10 +80,25 @@ class User(UserMixin, db.Model):
     )
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = PASSWORD_HASHER.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify password, upgrading legacy or outdated hashes in place"""
+        if not self.password_hash.startswith("$argon2"):
+            # Legacy werkzeug hash
+            if not check_password_hash(self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+
+        try:
+            PASSWORD_HASHER.verify(self.password_hash, password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False
+
+        if PASSWORD_HASHER.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
     def to_dict(self):
         return {
@@ -77,14 +119,15 @@ class User(UserMixin, db.Model):
 class File(db.Model):
     __tablename__ = "files"
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(UUID_TYPE, primary_key=True, default=lambda: str(uuid.uuid4()))
     filename = db.Column(db.String(255), nullable=False, index=True)
     original_filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(1000), nullable=False)
     file_size = db.Column(db.BigInteger, nullable=False)
     mime_type = db.Column(db.String(255))
+    mime_category = db.Column(db.String(16), index=True)
     file_hash = db.Column(db.String(64), index=True)  # SHA-256
-    owner_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    owner_id = db.Column(UUID_TYPE, db.ForeignKey("users.id"), nullable=False)
     parent_directory = db.Column(db.String(1000), default="")
     is_directory = db.Column(db.Boolean, default=False)
     is_public = db.Column(db.Boolean, default=False)
@@ -143,14 +186,14 @@ class File(db.Model):
 class FileVersion(db.Model):
     __tablename__ = "file_versions"
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    file_id = db.Column(db.String(36), db.ForeignKey("files.id"), nullable=False)
+    id = db.Column(UUID_TYPE, primary_key=True, default=lambda: str(uuid.uuid4()))
+    file_id = db.Column(UUID_TYPE, db.ForeignKey("files.id"), nullable=False)
     version_number = db.Column(db.Integer, nullable=False)
     file_path = db.Column(db.String(1000), nullable=False)
     file_size = db.Column(db.BigInteger, nullable=False)
     file_hash = db.Column(db.String(64))
     change_description = db.Column(db.Text)
-    created_by = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    created_by = db.Column(UUID_TYPE, db.ForeignKey("users.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     # Relations
@@ -160,9 +203,9 @@ class FileVersion(db.Model):
 class Share(db.Model):
     __tablename__ = "shares"
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    file_id = db.Column(db.String(36), db.ForeignKey("files.id"), nullable=False)
-    creator_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    id = db.Column(UUID_TYPE, primary_key=True, default=lambda: str(uuid.uuid4()))
+    file_id = db.Column(UUID_TYPE, db.ForeignKey("files.id"), nullable=False)
+    creator_id = db.Column(UUID_TYPE, db.ForeignKey("users.id"), nullable=False)
     share_token = db.Column(db.String(255), unique=True, nullable=False, index=True)
     share_type = db.Column(db.String(20), default="link")  # link, email, embed
     permissions = db.Column(
@@ -196,9 +239,9 @@ class Share(db.Model):
 class Activity(db.Model):
     __tablename__ = "activities"
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
-    file_id = db.Column(db.String(36), db.ForeignKey("files.id"), nullable=True)
+    id = db.Column(UUID_TYPE, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(UUID_TYPE, db.ForeignKey("users.id"), nullable=False)
+    file_id = db.Column(UUID_TYPE, db.ForeignKey("files.id"), nullable=True)
     action = db.Column(
         db.String(50), nullable=False
     )  # upload, download, delete, rename, share, view
@@ -223,11 +266,11 @@ class Activity(db.Model):
 class Comment(db.Model):
     __tablename__ = "comments"
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    file_id = db.Column(db.String(36), db.ForeignKey("files.id"), nullable=False)
-    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    id = db.Column(UUID_TYPE, primary_key=True, default=lambda: str(uuid.uuid4()))
+    file_id = db.Column(UUID_TYPE, db.ForeignKey("files.id"), nullable=False)
+    user_id = db.Column(UUID_TYPE, db.ForeignKey("users.id"), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    parent_id = db.Column(db.String(36), db.ForeignKey("comments.id"), nullable=True)
+    parent_id = db.Column(UUID_TYPE, db.ForeignKey("comments.id"), nullable=True)
     is_resolved = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(
@@ -248,8 +291,8 @@ class Comment(db.Model):
 class UserSession(db.Model):
     __tablename__ = "user_sessions"
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), nullable=False)
+    id = db.Column(UUID_TYPE, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(UUID_TYPE, db.ForeignKey("users.id"), nullable=False)
     session_token = db.Column(db.String(255), unique=True, nullable=False, index=True)
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.Text)
@@ -270,12 +313,80 @@ class SystemSettings(db.Model):
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
     )
-    updated_by = db.Column(db.String(36), db.ForeignKey("users.id"))
+    updated_by = db.Column(UUID_TYPE, db.ForeignKey("users.id"))
+
+
+class DailyUserStats(db.Model):
+    __tablename__ = "daily_user_stats"
+
+    date = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailyFileStats(db.Model):
+    __tablename__ = "daily_file_stats"
+
+    date = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+def increment_daily_count(connection, table, created_at):
+    """Add one to the counter row for created_at's day"""
+    day = (created_at or datetime.now(timezone.utc)).date()
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        connection.execute(
+            insert(table)
+            .values(date=day, count=1)
+            .on_conflict_do_update(
+                index_elements=[table.c.date], set_={"count": table.c.count + 1}
+            )
+        )
+        return
+
+    updated = connection.execute(
+        table.update().where(table.c.date == day).values(count=table.c.count + 1)
+    )
+    if not updated.rowcount:
+        connection.execute(table.insert().values(date=day, count=1))
+
+
+@event.listens_for(User, "after_insert")
+def count_new_user(mapper, connection, target):
+    increment_daily_count(connection, DailyUserStats.__table__, target.created_at)
+
+
+@event.listens_for(File, "after_insert")
+def count_new_file(mapper, connection, target):
+    increment_daily_count(connection, DailyFileStats.__table__, target.created_at)
 
 
 # Indexes for performance
-db.Index("idx_file_owner_directory", File.owner_id, File.parent_directory)
+db.Index(
+    "idx_file_owner_directory",
+    File.owner_id,
+    File.parent_directory,
+    postgresql_include=["filename", "file_size"],
+)
+db.Index("idx_file_parent_dir_owner", File.parent_directory, File.owner_id)
+db.Index("idx_file_owner_hash", File.owner_id, File.file_hash)
+db.Index("idx_file_owner_path", File.owner_id, File.file_path)
 db.Index("idx_file_created_at", File.created_at)
+db.Index("idx_file_owner_created", File.owner_id, File.created_at, File.id)
+db.Index("idx_file_owner_mime", File.owner_id, File.mime_type, File.file_size)
 db.Index("idx_activity_user_created", Activity.user_id, Activity.created_at)
+db.Index("idx_activity_file_created", Activity.file_id, Activity.created_at.desc())
 db.Index("idx_share_token", Share.share_token)
+db.Index(
+    "idx_share_creator_active", Share.creator_id, Share.is_active, Share.expires_at
+)
+db.Index(
+    "ux_active_share",
+    Share.file_id,
+    Share.creator_id,
+    unique=True,
+    sqlite_where=Share.is_active,
+    postgresql_where=Share.is_active,
+)
 db.Index("idx_session_token", UserSession.session_token, UserSession.expires_at)
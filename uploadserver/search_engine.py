@@ -3,16 +3,64 @@ Advanced search engine for UploadServer Pro
 """
 
 import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import cached_property
 import hashlib
-import mimetypes
 from datetime import datetime
 from whoosh import fields, index
 from whoosh.analysis import StandardAnalyzer, StemmingAnalyzer
-from whoosh.filedb.filestore import FileStorage
 from whoosh.qparser import QueryParser, MultifieldParser
 from whoosh.query import And, Or, Term, Prefix, Wildcard
-import magic
+from whoosh.writing import AsyncWriter
 import json
+from cachetools import TTLCache
+from sqlalchemy.orm import raiseload, selectinload
+
+try:
+    from charset_normalizer import from_bytes
+
+    CHARSET_NORMALIZER_AVAILABLE = True
+except ImportError:
+    CHARSET_NORMALIZER_AVAILABLE = False
+
+try:
+    import magic
+
+    # One libmagic handle for the process; loading its database is the
+    # expensive part of a lookup
+    MIME_SNIFFER = magic.Magic(mime=True)
+except Exception:
+    MIME_SNIFFER = None
+
+# Only the head of a file is indexed
+CONTENT_LIMIT = 10000
+
+# Seconds a parallel bulk rebuild waits for the index write lock
+WRITER_LOCK_TIMEOUT = 300
+
+OFFICE_MIME_TYPES = frozenset(
+    [
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ]
+)
+ARCHIVE_MIME_TYPES = frozenset(
+    ["application/zip", "application/x-tar", "application/gzip"]
+)
+
+
+def sniff_mime(path):
+    """Detect a file's MIME type from its contents, or None if unavailable"""
+    if MIME_SNIFFER is None:
+        return None
+    try:
+        return MIME_SNIFFER.from_file(path)
+    except Exception:
+        return None
+
 
 from .models import File, User
 
@@ -21,6 +69,23 @@ class SearchEngine:
     def __init__(self, index_dir="search_index"):
         self.index_dir = index_dir
         self.analyzer = StemmingAnalyzer()
+        # Set once the initial index_directory() pass has finished
+        self.index_ready = threading.Event()
+        # Short-lived search results, keyed with a per-user version so
+        # mutations invalidate without scanning the cache
+        self.result_cache = TTLCache(maxsize=4096, ttl=30)
+        self.cache_versions = defaultdict(int)
+        self.cache_lock = threading.Lock()
+        # Paths the server wrote and indexed itself, so the file monitor
+        # does not index them a second time
+        self.server_writes = TTLCache(maxsize=10000, ttl=60)
+        # Index handle is opened once and reused; each search opens its own
+        # searcher over it
+        self._idx = None
+        self.has_path_field = False
+        self._index_lock = threading.Lock()
+        # Built on first search from the index schema
+        self._parser = None
         self.ensure_index_directory()
 
     def ensure_index_directory(self):
@@ -28,8 +93,9 @@ class SearchEngine:
         if not os.path.exists(self.index_dir):
             os.makedirs(self.index_dir)
 
-    def create_schema(self):
-        """Create Whoosh schema for file indexing"""
+    @cached_property
+    def schema(self):
+        """Whoosh schema for file indexing"""
         return fields.Schema(
             id=fields.ID(unique=True, stored=True),
             filename=fields.TEXT(stored=True, analyzer=self.analyzer),
@@ -46,29 +112,73 @@ class SearchEngine:
             updated_at=fields.DATETIME(stored=True),
             file_hash=fields.ID(stored=True),
             metadata=fields.TEXT(stored=True, analyzer=self.analyzer),
+            file_path=fields.ID(stored=True),
         )
 
     def get_index(self):
         """Get or create search index"""
-        storage = FileStorage(self.index_dir)
-        if index.exists_in(self.index_dir):
-            return index.open_dir(self.index_dir)
-        else:
-            schema = self.create_schema()
-            return index.create_in(self.index_dir, schema)
+        if self._idx is None:
+            with self._index_lock:
+                if self._idx is None:
+                    if index.exists_in(self.index_dir):
+                        self._idx = index.open_dir(self.index_dir)
+                        if self.add_missing_fields(self._idx):
+                            # Reopen to pick up the extended schema
+                            self._idx = index.open_dir(self.index_dir)
+                    else:
+                        self._idx = index.create_in(self.index_dir, self.schema)
+                    self.has_path_field = "file_path" in self._idx.schema
+        return self._idx
+
+    def add_missing_fields(self, idx):
+        """Add schema fields introduced after the index was created
+
+        Returns True when the index schema was changed.
+        """
+        missing = [name for name in self.schema.names() if name not in idx.schema]
+        if not missing:
+            return False
+        try:
+            writer = idx.writer(timeout=WRITER_LOCK_TIMEOUT)
+            for name in missing:
+                writer.add_field(name, self.schema[name])
+            writer.commit()
+            return True
+        except Exception as e:
+            print(f"Error adding search index fields {missing}: {e}")
+            return False
+
+    def get_parser(self):
+        """Return the shared multi-field query parser"""
+        if self._parser is None:
+            self._parser = MultifieldParser(
+                [
+                    "filename",
+                    "content",
+                    "original_filename",
+                    "tags",
+                    "metadata",
+                    "owner_username",
+                ],
+                self.get_index().schema,
+            )
+        return self._parser
+
+    def close(self):
+        """Close the cached index handle"""
+        with self._index_lock:
+            if self._idx is not None:
+                self._idx.close()
+                self._idx = None
 
     def extract_file_content(self, file_path, mime_type):
         """Extract text content from various file types"""
         try:
             if mime_type and mime_type.startswith("text/"):
-                # Text files
-                encodings = ["utf-8", "latin-1", "cp1252"]
-                for encoding in encodings:
-                    try:
-                        with open(file_path, "r", encoding=encoding) as f:
-                            return f.read()[:10000]  # Limit content size
-                    except UnicodeDecodeError:
-                        continue
+                # Text files: read the indexed head once and decode in place
+                with open(file_path, "rb") as f:
+                    buf = f.read(CONTENT_LIMIT)
+                return buf.decode(self.detect_encoding(buf), errors="replace")
 
             elif mime_type == "application/pdf":
                 # PDF files (requires PyPDF2)
@@ -80,15 +190,11 @@ class SearchEngine:
                         content = ""
                         for page in reader.pages[:10]:  # Limit to first 10 pages
                             content += page.extract_text() + "\n"
-                        return content[:10000]
+                        return content[:CONTENT_LIMIT]
                 except ImportError:
                     return None
 
-            elif mime_type in [
-                "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-            ]:
+            elif mime_type in OFFICE_MIME_TYPES:
                 # Microsoft Office documents (requires python-docx)
                 try:
                     if mime_type.endswith(".wordprocessingml.document"):
@@ -98,16 +204,12 @@ class SearchEngine:
                         content = "\n".join(
                             [paragraph.text for paragraph in doc.paragraphs]
                         )
-                        return content[:10000]
+                        return content[:CONTENT_LIMIT]
                     # Add Excel and PowerPoint extraction if needed
                 except ImportError:
                     return None
 
-            elif mime_type in [
-                "application/zip",
-                "application/x-tar",
-                "application/gzip",
-            ]:
+            elif mime_type in ARCHIVE_MIME_TYPES:
                 # Archive files - list contents
                 try:
                     import zipfile
@@ -126,144 +228,225 @@ class SearchEngine:
         except Exception:
             return None
 
-    def index_file(self, file_obj):
-        """Index a single file"""
-        try:
-            idx = self.get_index()
-            writer = idx.writer()
-
-            # Extract content for indexing
-            content = ""
-            if not file_obj.is_directory:
-                content = (
-                    self.extract_file_content(file_obj.file_path, file_obj.mime_type)
-                    or ""
-                )
+    def detect_encoding(self, buf):
+        """Guess the text encoding of a byte buffer"""
+        if CHARSET_NORMALIZER_AVAILABLE:
+            best = from_bytes(buf).best()
+            if best is not None:
+                return best.encoding
 
-            # Prepare metadata
-            metadata_text = ""
-            if file_obj.file_metadata:
-                metadata_text = " ".join(
-                    [str(v) for v in file_obj.file_metadata.values() if isinstance(v, str)]
-                )
+        try:
+            buf.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the end of the buffer is
+            # still UTF-8
+            if e.start < len(buf) - 3:
+                return "latin-1"
+        return "utf-8"
+
+    def build_document(self, file_obj, content, owner_username=None):
+        """Build the index fields for a file record
+
+        Pass ``owner_username`` when it is already known; otherwise the
+        caller should have eager-loaded ``File.owner``.
+        """
+        if owner_username is None:
+            owner_username = file_obj.owner.username
+
+        # Prepare metadata
+        metadata_text = ""
+        if file_obj.file_metadata:
+            metadata_text = " ".join(
+                [str(v) for v in file_obj.file_metadata.values() if isinstance(v, str)]
+            )
 
-            tags_text = " ".join(file_obj.tags) if file_obj.tags else ""
-
-            writer.add_document(
-                id=file_obj.id,
-                filename=file_obj.filename,
-                content=content,
-                original_filename=file_obj.original_filename,
-                mime_type=file_obj.mime_type or "",
-                file_size=file_obj.file_size,
-                owner_id=file_obj.owner_id,
-                owner_username=file_obj.owner.username
-                if hasattr(file_obj, "owner")
-                else "",
-                parent_directory=file_obj.parent_directory,
-                tags=tags_text,
-                is_public=file_obj.is_public,
-                created_at=file_obj.created_at,
-                updated_at=file_obj.updated_at,
-                file_hash=file_obj.file_hash,
-                metadata=metadata_text,
+        tags_text = " ".join(file_obj.tags) if file_obj.tags else ""
+
+        document = dict(
+            id=file_obj.id,
+            filename=file_obj.filename,
+            content=content,
+            original_filename=file_obj.original_filename,
+            mime_type=file_obj.mime_type or "",
+            file_size=file_obj.file_size,
+            owner_id=file_obj.owner_id,
+            owner_username=owner_username,
+            parent_directory=file_obj.parent_directory,
+            tags=tags_text,
+            is_public=file_obj.is_public,
+            created_at=file_obj.created_at,
+            updated_at=file_obj.updated_at,
+            file_hash=file_obj.file_hash,
+            metadata=metadata_text,
+        )
+        # Indexes created before file_path existed may not have gained it yet;
+        # has_path_field is set once the index is opened by the writer
+        if self.has_path_field:
+            document["file_path"] = file_obj.file_path
+        return document
+
+    @contextmanager
+    def bulk_writer(self, procs=1, limitmb=256, multisegment=False, merge=True):
+        """Yield one index writer that is committed once when the block exits
+
+        Whoosh allows one writer per index across every thread and process.
+        Ordinary writes use an AsyncWriter, which buffers the batch and
+        commits from a background thread once the lock is free instead of
+        raising LockError. Parallel rebuilds wait for the lock instead.
+        """
+        idx = self.get_index()
+        if procs > 1 or multisegment:
+            writer = idx.writer(
+                procs=procs,
+                limitmb=limitmb,
+                multisegment=multisegment,
+                timeout=WRITER_LOCK_TIMEOUT,
             )
-            writer.commit()
+        else:
+            writer = AsyncWriter(idx, writerargs={"limitmb": limitmb})
+        try:
+            yield writer
+        except Exception:
+            writer.cancel()
+            raise
+        writer.commit(merge=merge)
+
+    def _add_doc(
+        self, writer, file_obj, file_path=None, owner_username=None, replace=True
+    ):
+        """Add or replace a file's document on an open writer
+
+        ``replace=False`` skips the delete-by-id lookup; only use it when the
+        index cannot already hold the document.
+        """
+        content = ""
+        if not file_obj.is_directory:
+            file_path = file_path or file_obj.file_path
+            if os.path.exists(file_path):
+                mime_type = file_obj.mime_type or sniff_mime(file_path)
+                content = self.extract_file_content(file_path, mime_type) or ""
+
+        document = self.build_document(file_obj, content, owner_username)
+        if replace:
+            writer.update_document(**document)
+        else:
+            writer.add_document(**document)
 
-        except Exception as e:
-            print(f"Error indexing file {file_obj.filename}: {e}")
+    def index_file(self, file_obj, writer=None, owner_username=None):
+        """Index a single file"""
+        self.update_file(file_obj, writer=writer, owner_username=owner_username)
+
+    def indexable_files(self, user_id=None):
+        """Query the files that belong in the index, optionally for one owner
+
+        Private files are indexed too: owners search their own files and
+        search() filters anonymous queries with public_only.
+        """
+        query = File.query
+        if user_id:
+            query = query.filter_by(owner_id=user_id)
+        # Owners are loaded per batch; any other lazy load fails loudly
+        # instead of issuing one query per file
+        return query.options(selectinload(File.owner), raiseload("*"))
 
     def index_directory(self, directory_path, user_id=None):
         """Index all files in a directory"""
         try:
             from .models import db, File
 
-            # Query files from database
-            query = File.query
-            if user_id:
-                query = query.filter_by(owner_id=user_id)
-            else:
-                query = query.filter_by(is_public=True)
+            # Stream rows in batches; see indexable_files()
+            files = (
+                self.indexable_files(user_id)
+                .execution_options(stream_results=True)
+                .yield_per(500)
+            )
+
+            # One single-process writer and one commit for the whole pass;
+            # an empty index has nothing to replace
+            replace = self.get_index().doc_count_all() > 0
+            with self.bulk_writer() as writer:
+                for file_obj in files:
+                    try:
+                        full_path = os.path.join(directory_path, file_obj.file_path)
+                        self._add_doc(writer, file_obj, full_path, replace=replace)
+                    except Exception as e:
+                        print(f"Error indexing file {file_obj.filename}: {e}")
 
-            files = query.all()
+            # Only a committed pass opens the "index building" gate
+            self.index_ready.set()
+            return True
 
-            idx = self.get_index()
-            writer = idx.writer()
+        except Exception as e:
+            print(f"Error indexing directory: {e}")
+            return False
 
-            for file_obj in files:
-                try:
-                    # Extract content
-                    content = ""
-                    if not file_obj.is_directory:
-                        full_path = os.path.join(directory_path, file_obj.file_path)
-                        if os.path.exists(full_path):
-                            content = (
-                                self.extract_file_content(full_path, file_obj.mime_type)
-                                or ""
-                            )
-
-                    # Prepare metadata
-                    metadata_text = ""
-                    if file_obj.file_metadata:
-                        metadata_text = " ".join(
-                            [
-                                str(v)
-                                for v in file_obj.file_metadata.values()
-                                if isinstance(v, str)
-                            ]
-                        )
+    def bulk_reindex(self, directory_path, user_id=None, procs=None, limitmb=256):
+        """Rebuild index documents for all files using one process per core
 
-                    tags_text = " ".join(file_obj.tags) if file_obj.tags else ""
-
-                    writer.add_document(
-                        id=file_obj.id,
-                        filename=file_obj.filename,
-                        content=content,
-                        original_filename=file_obj.original_filename,
-                        mime_type=file_obj.mime_type or "",
-                        file_size=file_obj.file_size,
-                        owner_id=file_obj.owner_id,
-                        owner_username=file_obj.owner.username
-                        if hasattr(file_obj, "owner")
-                        else "",
-                        parent_directory=file_obj.parent_directory,
-                        tags=tags_text,
-                        is_public=file_obj.is_public,
-                        created_at=file_obj.created_at,
-                        updated_at=file_obj.updated_at,
-                        file_hash=file_obj.file_hash,
-                        metadata=metadata_text,
-                    )
-                except Exception as e:
-                    print(f"Error indexing file {file_obj.filename}: {e}")
+        Each worker writes its own segment and nothing is merged on commit;
+        optimize_index() folds the segments together later.
+        """
+        procs = procs or os.cpu_count() or 1
+        try:
+            files = self.indexable_files(user_id).yield_per(1000)
 
-            writer.commit()
+            with self.bulk_writer(
+                procs=procs, limitmb=limitmb, multisegment=True, merge=False
+            ) as writer:
+                for file_obj in files:
+                    try:
+                        full_path = os.path.join(directory_path, file_obj.file_path)
+                        self._add_doc(writer, file_obj, full_path)
+                    except Exception as e:
+                        print(f"Error indexing file {file_obj.filename}: {e}")
+
+            if user_id:
+                self.invalidate_cache(user_id)
+            else:
+                with self.cache_lock:
+                    self.result_cache.clear()
+            self.index_ready.set()
             return True
 
         except Exception as e:
-            print(f"Error indexing directory: {e}")
+            print(f"Error rebuilding search index: {e}")
             return False
 
+    def cached_search(
+        self, query_string, user_id=None, filters=None, limit=50, offset=0
+    ):
+        """search() behind a short TTL cache keyed by user, query and filters"""
+        filters = filters or {}
+        key = (
+            user_id,
+            self.cache_versions[user_id],
+            query_string,
+            tuple(sorted(filters.items())),
+            limit,
+            offset,
+        )
+        with self.cache_lock:
+            results = self.result_cache.get(key)
+        if results is not None:
+            return results
+
+        results = self.search(
+            query_string, user_id=user_id, filters=filters, limit=limit, offset=offset
+        )
+        if "error" not in results:
+            with self.cache_lock:
+                self.result_cache[key] = results
+        return results
+
+    def invalidate_cache(self, user_id):
+        """Drop cached search results for a user"""
+        with self.cache_lock:
+            self.cache_versions[user_id] += 1
+
     def search(self, query_string, user_id=None, filters=None, limit=50, offset=0):
         """Perform search with filters"""
         try:
-            idx = self.get_index()
-            searcher = idx.searcher()
-
-            # Build query parser for multi-field search
-            parser = MultifieldParser(
-                [
-                    "filename",
-                    "content",
-                    "original_filename",
-                    "tags",
-                    "metadata",
-                    "owner_username",
-                ],
-                idx.schema,
-            )
-
-            query = parser.parse(query_string)
+            query = self.get_parser().parse(query_string)
 
             # Apply filters
             if user_id:
@@ -312,41 +495,57 @@ class SearchEngine:
                         ]
                     )
 
-            # Execute search
-            results = searcher.search(query, limit=limit, offset=offset)
-
-            # Format results
-            formatted_results = []
-            for hit in results:
-                result = {
-                    "id": hit["id"],
-                    "filename": hit["filename"],
-                    "original_filename": hit["original_filename"],
-                    "mime_type": hit["mime_type"],
-                    "file_size": hit["file_size"],
-                    "owner_id": hit["owner_id"],
-                    "owner_username": hit["owner_username"],
-                    "parent_directory": hit["parent_directory"],
-                    "tags": hit.get("tags", ""),
-                    "is_public": hit["is_public"],
-                    "created_at": hit["created_at"],
-                    "updated_at": hit["updated_at"],
-                    "file_hash": hit["file_hash"],
-                    "score": hit.score,
-                    "highlights": [],
-                }
-
-                # Add highlights
-                if hasattr(hit, "highlights"):
-                    for field in ["filename", "content", "original_filename"]:
-                        if field in hit.highlights:
-                            result["highlights"].extend(hit.highlights[field])
-
-                formatted_results.append(result)
+            with self.get_index().searcher() as searcher:
+                # Execute search, scoring only as many hits as the page needs
+                if limit is None:
+                    results = searcher.search(query, limit=None)
+                    hits = results[offset:]
+                elif limit and offset % limit == 0:
+                    page = searcher.search_page(
+                        query, offset // limit + 1, pagelen=limit
+                    )
+                    results = page.results
+                    # search_page clamps past-the-end requests to the last page
+                    hits = page if offset < page.total else []
+                else:
+                    results = searcher.search(query, limit=offset + limit)
+                    hits = results[offset : offset + limit]
+
+                # Every matching document, not just the scored ones
+                total = len(results)
+
+                # Format results
+                formatted_results = []
+                for hit in hits:
+                    result = {
+                        "id": hit["id"],
+                        "filename": hit["filename"],
+                        "original_filename": hit["original_filename"],
+                        "mime_type": hit["mime_type"],
+                        "file_size": hit["file_size"],
+                        "owner_id": hit["owner_id"],
+                        "owner_username": hit["owner_username"],
+                        "parent_directory": hit["parent_directory"],
+                        "tags": hit.get("tags", ""),
+                        "is_public": hit["is_public"],
+                        "created_at": hit["created_at"],
+                        "updated_at": hit["updated_at"],
+                        "file_hash": hit["file_hash"],
+                        "score": hit.score,
+                        "highlights": [],
+                    }
+
+                    # Add highlights
+                    if hasattr(hit, "highlights"):
+                        for field in ["filename", "content", "original_filename"]:
+                            if field in hit.highlights:
+                                result["highlights"].extend(hit.highlights[field])
+
+                    formatted_results.append(result)
 
             return {
                 "results": formatted_results,
-                "total": len(results),
+                "total": total,
                 "limit": limit,
                 "offset": offset,
                 "query": query_string,
@@ -368,23 +567,22 @@ class SearchEngine:
     def get_suggestions(self, query_string, field="filename", limit=10):
         """Get autocomplete suggestions"""
         try:
-            idx = self.get_index()
-            searcher = idx.searcher()
+            with self.get_index().searcher() as searcher:
 
-            # Create prefix query for autocomplete
-            query = Prefix(field, query_string)
-            results = searcher.search(query, limit=limit)
+                # Create prefix query for autocomplete
+                query = Prefix(field, query_string)
+                results = searcher.search(query, limit=limit)
 
-            suggestions = []
-            seen_terms = set()
+                suggestions = []
+                seen_terms = set()
 
-            for hit in results:
-                term = hit[field]
-                if term and term not in seen_terms:
-                    suggestions.append(term)
-                    seen_terms.add(term)
+                for hit in results:
+                    term = hit[field]
+                    if term and term not in seen_terms:
+                        suggestions.append(term)
+                        seen_terms.add(term)
 
-            return suggestions
+                return suggestions
 
         except Exception as e:
             print(f"Suggestion error: {e}")
@@ -393,90 +591,88 @@ class SearchEngine:
     def get_popular_files(self, limit=10, user_id=None):
         """Get most accessed/downloaded files"""
         try:
-            idx = self.get_index()
-            searcher = idx.searcher()
+            with self.get_index().searcher() as searcher:
 
-            # Sort by download count or file size
-            query = Every()
-            if user_id:
-                query = Term("owner_id", user_id)
+                # Sort by download count or file size
+                query = Every()
+                if user_id:
+                    query = Term("owner_id", user_id)
 
-            results = searcher.search(
-                query, sortedby="file_size", reverse=True, limit=limit
-            )
+                results = searcher.search(
+                    query, sortedby="file_size", reverse=True, limit=limit
+                )
 
-            return [hit.fields() for hit in results]
+                return [hit.fields() for hit in results]
 
         except Exception as e:
             print(f"Popular files error: {e}")
             return []
 
-    def update_file(self, file_obj):
-        """Update file index entry"""
+    def update_file(self, file_obj, writer=None, owner_username=None):
+        """Update file index entry, on the caller's writer if one is given"""
         try:
-            idx = self.get_index()
-            writer = idx.writer()
-
-            # Delete existing document
-            writer.delete_by_term("id", file_obj.id)
-
-            # Add updated document
-            content = ""
-            if not file_obj.is_directory:
-                content = (
-                    self.extract_file_content(file_obj.file_path, file_obj.mime_type)
-                    or ""
-                )
+            if writer is not None:
+                self._add_doc(writer, file_obj, owner_username=owner_username)
+            else:
+                with self.bulk_writer() as writer:
+                    self._add_doc(writer, file_obj, owner_username=owner_username)
+            self.invalidate_cache(file_obj.owner_id)
 
-            metadata_text = ""
-            if file_obj.file_metadata:
-                metadata_text = " ".join(
-                    [str(v) for v in file_obj.file_metadata.values() if isinstance(v, str)]
-                )
+        except Exception as e:
+            print(f"Error updating file index: {e}")
 
-            tags_text = " ".join(file_obj.tags) if file_obj.tags else ""
-
-            writer.add_document(
-                id=file_obj.id,
-                filename=file_obj.filename,
-                content=content,
-                original_filename=file_obj.original_filename,
-                mime_type=file_obj.mime_type or "",
-                file_size=file_obj.file_size,
-                owner_id=file_obj.owner_id,
-                owner_username=file_obj.owner.username
-                if hasattr(file_obj, "owner")
-                else "",
-                parent_directory=file_obj.parent_directory,
-                tags=tags_text,
-                is_public=file_obj.is_public,
-                created_at=file_obj.created_at,
-                updated_at=file_obj.updated_at,
-                file_hash=file_obj.file_hash,
-                metadata=metadata_text,
-            )
+    def bulk_update(self, directory_path, file_objs, deleted_ids=(), deleted_paths=()):
+        """Re-index changed files and drop deleted ones with a single writer
 
-            writer.commit()
+        ``deleted_paths`` removes documents by relative file path, for files
+        whose database row is already gone. Returns True once the batch is
+        committed (or queued behind the write lock).
+        """
+        try:
+            with self.bulk_writer() as writer:
+                for file_id in deleted_ids:
+                    writer.delete_by_term("id", file_id)
+                if self.has_path_field:
+                    for path in deleted_paths:
+                        writer.delete_by_term("file_path", path)
+
+                for file_obj in file_objs:
+                    full_path = os.path.join(directory_path, file_obj.file_path)
+                    self._add_doc(writer, file_obj, full_path)
+
+            for owner_id in {file_obj.owner_id for file_obj in file_objs}:
+                self.invalidate_cache(owner_id)
+            return True
 
         except Exception as e:
             print(f"Error updating file index: {e}")
+            return False
+
+    def mark_server_write(self, path):
+        """Note that the server itself wrote and indexes a relative path"""
+        with self.cache_lock:
+            self.server_writes[os.path.normpath(path)] = True
 
-    def delete_file(self, file_id):
-        """Remove file from index"""
+    def is_server_write(self, path):
+        """Whether a relative path was recently written by the server"""
+        with self.cache_lock:
+            return os.path.normpath(path) in self.server_writes
+
+    def delete_file(self, file_id, writer=None):
+        """Remove file from index, on the caller's writer if one is given"""
         try:
-            idx = self.get_index()
-            writer = idx.writer()
-            writer.delete_by_term("id", file_id)
-            writer.commit()
+            if writer is not None:
+                writer.delete_by_term("id", file_id)
+            else:
+                with self.bulk_writer() as writer:
+                    writer.delete_by_term("id", file_id)
         except Exception as e:
             print(f"Error deleting from index: {e}")
 
     def optimize_index(self):
         """Optimize search index for better performance"""
         try:
-            idx = self.get_index()
-            writer = idx.writer()
-            writer.commit(optimize=True)
+            AsyncWriter(self.get_index()).commit(optimize=True)
         except Exception as e:
             print(f"Error optimizing index: {e}")
 
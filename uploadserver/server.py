@@ -6,6 +6,7 @@ import threading
 import webbrowser
 import mimetypes
 import json
+import hmac
 from functools import wraps
 from getpass import getpass
 from pathlib import Path
@@ -98,7 +99,8 @@ def create_app():
             return redirect(url_for("index"))
 
         if request.method == "POST":
-            if request.form.get("password") == PASSWORD:
+            password = request.form.get("password", "")
+            if hmac.compare_digest(password.encode(), PASSWORD.encode()):
                 session["logged_in"] = True
                 flash("Login successful!", "success")
                 next_url = request.args.get("next")
@@ -38,6 +38,10 @@ class UploadServerPro {
             this.handleFileUploaded(data);
         });
 
+        this.socket.on('files_uploaded', (events) => {
+            this.handleFilesUploaded(events);
+        });
+
         this.socket.on('file_operation_update', (data) => {
             this.handleFileOperation(data);
         });
@@ -643,6 +647,16 @@ class UploadServerPro {
         this.updateStorageIndicator();
     }
 
+    handleFilesUploaded(events) {
+        events.forEach((data) => {
+            this.showNotification(`${data.file.original_filename} uploaded`, 'success');
+        });
+        this.refreshFileList();
+
+        // Update storage indicator
+        this.updateStorageIndicator();
+    }
+
     handleFileOperation(data) {
         this.showNotification(`${data.user.username} ${data.operation} ${data.details.filename || 'file'}`, 'info');
         this.refreshFileList();